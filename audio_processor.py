@@ -1,14 +1,37 @@
 """Audio processing module for chord estimation (ChordAI-python-main compatible)."""
+import functools
 import librosa
 import numpy as np
 import json
 import os
+import queue
+import threading
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
 
 try:
     from dlchordx import Chord
 except ImportError:
     Chord = None
 
+# Set CHORDAI_NNAUDIO=1 to compute the CQT with nnAudio on a CUDA device.
+# Its scaling and padding are not bit-compatible with the librosa path the
+# model was trained on, so it is opt-in; torch is only imported then.
+USE_NNAUDIO = os.environ.get('CHORDAI_NNAUDIO') == '1'
+
+torch = None
+CQT2010v2 = None
+if USE_NNAUDIO:
+    try:
+        import torch
+        from nnAudio.features import CQT2010v2
+    except ImportError:
+        torch = None
+        CQT2010v2 = None
+
 TONES = ["C", "Db", "D", "Eb", "E", "F", "Gb", "G", "Ab", "A", "Bb", "B"]
 
 KEY_NAMES = [
@@ -24,41 +47,243 @@ def minmax(x, axis=None):
     x_max = x.max(axis=axis, keepdims=True)
     denom = x_max - x_min
     denom = np.where(denom == 0, 1, denom)
-    return (x - x_min) / denom
+    # Subtract into one output buffer and divide in place (no second temporary)
+    out = np.subtract(x, x_min, dtype=np.result_type(x, 1.0))
+    out /= denom
+    return out
+
+
+# nnAudio CQT layers keyed by their parameters (the kernels are built once)
+_NNAUDIO_CQT = {}
+# Set after a failed GPU CQT (e.g. CUDA out of memory) so later calls go
+# straight to librosa
+_nnaudio_failed = False
+
+
+def _default_cqt_backend():
+    """Use the GPU CQT when enabled and nnAudio and CUDA are available."""
+    if (USE_NNAUDIO and not _nnaudio_failed and CQT2010v2 is not None
+            and torch.cuda.is_available()):
+        return "nnaudio"
+    return "librosa"
+
+
+def _nnaudio_cqt(y, sr, n_bins, bins_per_octave, hop_length, fmin, window,
+                 filter_scale):
+    """Compute CQT magnitudes of a (channels, samples) array on the GPU.
+
+    Returns:
+        float32 array of shape (channels, frames, n_bins).
+    """
+    key = (sr, n_bins, bins_per_octave, hop_length, fmin, window, filter_scale)
+    transform = _NNAUDIO_CQT.get(key)
+    if transform is None:
+        transform = CQT2010v2(
+            sr=sr, hop_length=hop_length, fmin=fmin, n_bins=n_bins,
+            bins_per_octave=bins_per_octave, filter_scale=filter_scale,
+            window=window, pad_mode="constant", output_format="Magnitude",
+            verbose=False).to("cuda")
+        _NNAUDIO_CQT[key] = transform
+
+    with torch.no_grad():
+        x = torch.from_numpy(np.ascontiguousarray(y, dtype=np.float32))
+        S = transform(x.to("cuda"))
+    S = S.abs().cpu().numpy().astype(np.float32, copy=False)
+    return S.transpose(0, 2, 1)
+
+
+def _relative_bandwidth(freqs):
+    """Relative bandwidth of each CQT filter (same formula as librosa)."""
+    bpo = np.empty_like(freqs)
+    logf = np.log2(freqs)
+    bpo[0] = 1 / (logf[1] - logf[0])
+    bpo[-1] = 1 / (logf[-1] - logf[-2])
+    bpo[1:-1] = 2 / (logf[2:] - logf[:-2])
+    return (2.0 ** (2 / bpo) - 1) / (2.0 ** (2 / bpo) + 1)
+
+
+@functools.lru_cache(maxsize=8)
+def _get_cqt_kernels(sr, n_bins, bins_per_octave, hop_length, fmin,
+                     filter_scale, window, dtype):
+    """Build the per-octave CQT filter bank once per parameter set.
+
+    Mirrors the filter construction of ``librosa.vqt`` for
+    ``librosa.cqt(..., scale=True)`` so that ``_librosa_cqt`` can reuse the
+    FFT basis instead of redesigning it on every call.
+
+    Returns:
+        Tuple of (early downsample factor, per-octave list of
+        ``(fft_basis, n_fft, hop_length, resample_after)``, sqrt filter
+        lengths used for scaling).
+    """
+    n_octaves = int(np.ceil(float(n_bins) / bins_per_octave))
+    n_filters = min(bins_per_octave, n_bins)
+
+    freqs = librosa.cqt_frequencies(
+        n_bins, fmin=fmin, bins_per_octave=bins_per_octave)
+    alpha = _relative_bandwidth(freqs)
+
+    _, filter_cutoff = librosa.filters.wavelet_lengths(
+        freqs=freqs, sr=sr, window=window, filter_scale=filter_scale,
+        gamma=0, alpha=alpha)
+    nyquist = sr / 2.0
+    if filter_cutoff > nyquist:
+        raise ValueError(
+            "CQT filter cutoff exceeds the Nyquist frequency; "
+            "reduce the number of bins")
+
+    # Early downsampling, as librosa does when the top octave allows it
+    count = max(0, int(np.ceil(np.log2(nyquist / filter_cutoff)) - 1) - 1)
+    num_twos = 0
+    h = hop_length
+    while h > 0 and h % 2 == 0:
+        num_twos += 1
+        h //= 2
+    count = min(count, max(0, num_twos - n_octaves + 1))
+    downsample = 2 ** count
+
+    base_sr = sr / float(downsample)
+    my_sr = base_sr
+    my_hop = hop_length // downsample
+    fft = librosa.get_fftlib()
+
+    octaves = []
+    for i in range(n_octaves):
+        if i == 0:
+            sl = slice(-n_filters, None)
+        else:
+            sl = slice(-n_filters * (i + 1), -n_filters * i)
+
+        basis, lengths = librosa.filters.wavelet(
+            freqs=freqs[sl], sr=my_sr, filter_scale=filter_scale, norm=1,
+            pad_fft=True, window=window, gamma=0, alpha=alpha[sl])
+        n_fft = basis.shape[1]
+        basis *= lengths[:, np.newaxis] / float(n_fft)
+        fft_basis = fft.fft(basis, n=n_fft, axis=1)[:, :(n_fft // 2) + 1]
+        fft_basis = librosa.util.sparsify_rows(
+            fft_basis, quantile=0.01, dtype=dtype)
+        fft_basis[:] *= np.sqrt(base_sr / my_sr)
+
+        resample_after = my_hop % 2 == 0 and i < n_octaves - 1
+        octaves.append((fft_basis, n_fft, my_hop, resample_after))
+        if my_hop % 2 == 0:
+            my_hop //= 2
+            my_sr /= 2.0
+
+    lengths, _ = librosa.filters.wavelet_lengths(
+        freqs=freqs, sr=base_sr, window=window, filter_scale=filter_scale,
+        gamma=0, alpha=alpha)
+
+    return downsample, octaves, np.sqrt(lengths)
+
+
+def _librosa_cqt(y, sr, n_bins, bins_per_octave, hop_length, fmin, window,
+                 filter_scale, magnitude=False):
+    """Equivalent of ``librosa.cqt(..., scale=True)`` with a cached basis.
+
+    Accepts 1-D or multichannel ``y``; the channel axes are kept in front
+    of ``(n_bins, frames)`` like librosa. With ``magnitude=True`` the
+    equivalent of ``np.abs(librosa.cqt(...))`` is returned, written octave
+    by octave without assembling the complex result.
+    """
+    dtype = librosa.util.dtype_r2c(y.dtype)
+    downsample, octaves, sqrt_lengths = _get_cqt_kernels(
+        sr, n_bins, bins_per_octave, hop_length, fmin, filter_scale, window,
+        np.dtype(dtype))
+
+    lead_shape = y.shape[:-1]
+    if downsample > 1:
+        y = librosa.resample(
+            y, orig_sr=downsample, target_sr=1, res_type="soxr_hq",
+            scale=True)
+
+    responses = []
+    for fft_basis, n_fft, hop, resample_after in octaves:
+        D = librosa.stft(
+            y, n_fft=n_fft, hop_length=hop, window="ones",
+            pad_mode="constant", dtype=dtype)
+        Dr = D.reshape((-1,) + D.shape[-2:])
+        resp = np.empty(
+            (Dr.shape[0], fft_basis.shape[0], Dr.shape[-1]), dtype=D.dtype)
+        for c in range(Dr.shape[0]):
+            resp[c] = fft_basis.dot(Dr[c])
+        responses.append(resp.reshape(lead_shape + resp.shape[-2:]))
+
+        if resample_after:
+            y = librosa.resample(
+                y, orig_sr=2, target_sr=1, res_type="soxr_hq", scale=True)
+
+    # Stack octaves from the top down, trimmed to a common frame count
+    n_frames = min(r.shape[-1] for r in responses)
+    if magnitude:
+        out_dtype = np.finfo(dtype).dtype
+    else:
+        out_dtype = dtype
+    C = np.empty(lead_shape + (n_bins, n_frames), dtype=out_dtype, order="F")
+    end = n_bins
+    for resp in responses:
+        n_oct = resp.shape[-2]
+        if end < n_oct:
+            rows = slice(0, end)
+            resp = resp[..., -end:, :n_frames]
+        else:
+            rows = slice(end - n_oct, end)
+            resp = resp[..., :n_frames]
+        if magnitude:
+            resp /= sqrt_lengths[rows, np.newaxis]
+            np.abs(resp, out=C[..., rows, :])
+        else:
+            C[..., rows, :] = resp
+        end -= n_oct
+
+    if not magnitude:
+        C /= sqrt_lengths[:, np.newaxis]
+    return C
 
 
 def cqt(y, sr=22050, n_bins=12 * 3 * 7, bins_per_octave=12 * 3,
-         hop_length=512, fmin=32.7, window="hann", Qfactor=20.0, norm=minmax):
-    """Compute CQT spectrogram with L+R and L-R channels."""
+         hop_length=512, fmin=32.7, window="hann", Qfactor=20.0, norm=minmax,
+         backend=None):
+    """Compute CQT spectrogram with L+R and L-R channels.
+
+    ``backend`` selects ``"librosa"`` (CPU) or ``"nnaudio"`` (CUDA); by
+    default librosa is used unless ``CHORDAI_NNAUDIO=1`` is set. A failing
+    GPU CQT falls back to librosa.
+    """
+    global _nnaudio_failed
     mono = True if len(y.shape) == 1 else False
 
     filter_scale = (1 / bins_per_octave) * Qfactor
 
+    if backend is None:
+        backend = _default_cqt_backend()
+
+    # Mid (L+R) and side (L-R) share one multichannel CQT call
     if mono:
-        S = np.abs(
-            librosa.cqt(
-                y, sr=sr, n_bins=n_bins, bins_per_octave=bins_per_octave,
-                hop_length=hop_length, filter_scale=filter_scale,
-                fmin=fmin, scale=True, window=window)
-        ).astype("float32").T
+        channels = y[np.newaxis]
     else:
-        S_lr = np.abs(
-            librosa.cqt(
-                (y[0] * 0.5 + y[1] * 0.5),
-                sr=sr, n_bins=n_bins, bins_per_octave=bins_per_octave,
-                hop_length=hop_length, filter_scale=filter_scale,
-                fmin=fmin, scale=True, window=window)
-        ).astype("float32")
-
-        S_lrm = np.abs(
-            librosa.cqt(
-                (y[0] - y[1]),
-                sr=sr, n_bins=n_bins, bins_per_octave=bins_per_octave,
-                hop_length=hop_length, filter_scale=filter_scale,
-                fmin=fmin, scale=True, window=window)
-        ).astype("float32")
-
-        S = np.array((S_lr.T, S_lrm.T))
+        channels = np.stack([y[0] * 0.5 + y[1] * 0.5, y[0] - y[1]])
+
+    S = None
+    if backend == "nnaudio":
+        try:
+            S = _nnaudio_cqt(
+                channels, sr, n_bins, bins_per_octave, hop_length, fmin,
+                window, filter_scale)
+        except RuntimeError as e:
+            # CUDA errors (including out of memory) surface as RuntimeError
+            print(f"GPU での CQT 計算に失敗したため librosa に切り替えます: {e}")
+            _nnaudio_failed = True
+            _NNAUDIO_CQT.clear()
+            torch.cuda.empty_cache()
+    if S is None:
+        S = _librosa_cqt(
+            channels, sr, n_bins, bins_per_octave, hop_length, fmin,
+            window, filter_scale, magnitude=True,
+        ).astype(np.float32, copy=False).transpose(0, 2, 1)
+
+    if mono:
+        S = S[0]
 
     if norm is not None:
         S = norm(S)
@@ -66,6 +291,41 @@ def cqt(y, sr=22050, n_bins=12 * 3 * 7, bins_per_octave=12 * 3,
     return S
 
 
+def _load_audio(path, sr=22050, mono=False):
+    """Load audio as float32, duplicating mono input to two channels."""
+    y, sr = librosa.load(path, sr=sr, mono=mono, dtype=np.float32)
+
+    if len(y.shape) == 1:
+        y = np.array([y, y])
+
+    return y, sr
+
+
+def _compute_features(y, sr):
+    """Compute the padded CQT model input for loaded audio."""
+    hop_length = 512 + 32
+    bins_per_second = sr / hop_length
+    duration = y.shape[-1] / sr
+
+    # Min-max normalization runs in the model graph (ChordModel.predict)
+    S = cqt(
+        y, sr=sr, n_bins=12 * 3 * 7, bins_per_octave=12 * 3,
+        hop_length=hop_length, Qfactor=22.0, norm=None)
+
+    # Pad to multiple of 8192 (float32, as consumed by the model), writing
+    # the spectrogram straight into the (frames, bins, channels) layout.
+    # Padding with the minimum keeps the min/max, so it normalizes to 0.
+    n_channels, n_frames, n_bins = S.shape
+    p = 8192 - (n_frames % 8192)
+    S_padding = np.empty((n_frames + p, n_bins, n_channels), dtype=np.float32)
+    S_padding[:n_frames] = S.transpose(1, 2, 0)
+    S_padding[n_frames:] = S.min()
+
+    S_padding = S_padding[np.newaxis]
+
+    return S_padding, bins_per_second, duration
+
+
 def preprocess(path, sr=22050, mono=False):
     """Load and preprocess audio for model input.
 
@@ -75,28 +335,113 @@ def preprocess(path, sr=22050, mono=False):
         mono: Whether to force mono loading.
 
     Returns:
-        Tuple of (preprocessed spectrogram, bins_per_second, duration).
+        Tuple of (unnormalized spectrogram of shape (1, frames, n_bins, 2),
+        bins_per_second, duration).
     """
-    y, sr = librosa.load(path, sr=sr, mono=mono)
-    hop_length = 512 + 32
-    bins_per_second = sr / hop_length
-    duration = librosa.get_duration(y=y)
+    y, sr = _load_audio(path, sr=sr, mono=mono)
+    return _compute_features(y, sr)
 
-    if len(y.shape) == 1:
-        y = np.array([y, y])
 
-    S = cqt(
-        y, sr=sr, n_bins=12 * 3 * 7, bins_per_octave=12 * 3,
-        hop_length=hop_length, Qfactor=22.0)
+# How often blocked pipeline stages check whether they were cancelled
+_STAGE_POLL = 0.1
 
-    # Pad to multiple of 8192
-    p = 8192 - (S.shape[1] % 8192)
-    S_padding = np.zeros((S.shape[0], S.shape[1] + p, S.shape[2]))
-    S_padding[:, :S.shape[1], :] = S
-    S_padding = S_padding.transpose(1, 2, 0)
-    S_padding = np.array([S_padding])
 
-    return S_padding, bins_per_second, duration
+def _stage_put(outputs, item, stop):
+    """Put item on outputs, giving up once stop is set."""
+    while not stop.is_set():
+        try:
+            outputs.put(item, timeout=_STAGE_POLL)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _run_stage(func, inputs, outputs, stop):
+    """Apply func to every (path, args) item of inputs until None arrives.
+
+    Exceptions are passed downstream in place of the result so the
+    consumer can re-raise them in order. The stage exits early when stop
+    is set.
+    """
+    while not stop.is_set():
+        try:
+            item = inputs.get(timeout=_STAGE_POLL)
+        except queue.Empty:
+            continue
+        if item is None:
+            _stage_put(outputs, None, stop)
+            return
+        path, args, error = item
+        result = None
+        if error is None:
+            try:
+                result = func(*args)
+            except Exception as e:
+                error = e
+        if not _stage_put(outputs, (path, result, error), stop):
+            return
+
+
+def process_folder(paths, chord_model, sr=22050, mono=False):
+    """Preprocess and predict several audio files with overlapping stages.
+
+    Loading runs in one thread and the CQT in another, both of which
+    spend most of their time in GIL-releasing native code, while the
+    model runs in the calling thread. Bounded queues between the stages
+    keep at most a couple of files in memory, so file N+1 is loaded and
+    transformed while file N is being predicted. When the generator is
+    closed early or raises, the stages stop after their current file.
+
+    Args:
+        paths: Iterable of audio file paths.
+        chord_model: Object with a ``predict(spectrogram)`` method,
+            usually a ``ChordModel``.
+        sr: Target sample rate.
+        mono: Whether to force mono loading.
+
+    Yields:
+        Tuples of (path, pred, bins_per_second, duration) in input order.
+    """
+    jobs = queue.Queue()
+    loaded = queue.Queue(maxsize=2)
+    features = queue.Queue(maxsize=2)
+    stop = threading.Event()
+
+    for path in paths:
+        jobs.put((path, (path, sr, mono), None))
+    jobs.put(None)
+
+    stages = [
+        threading.Thread(target=_run_stage,
+                         args=(_load_audio, jobs, loaded, stop),
+                         name="process_folder-load", daemon=True),
+        threading.Thread(target=_run_stage,
+                         args=(_compute_features, loaded, features, stop),
+                         name="process_folder-cqt", daemon=True),
+    ]
+    for stage in stages:
+        stage.start()
+
+    try:
+        while True:
+            item = features.get()
+            if item is None:
+                break
+            path, result, error = item
+            if error is not None:
+                raise error
+            S, bins_per_second, duration = result
+            yield path, chord_model.predict(S), bins_per_second, duration
+    finally:
+        stop.set()
+        # Drop queued audio and spectrograms right away
+        for q in (jobs, loaded, features):
+            while True:
+                try:
+                    q.get_nowait()
+                except queue.Empty:
+                    break
 
 
 def estimate_tempo(path):
@@ -108,7 +453,7 @@ def estimate_tempo(path):
     Returns:
         Estimated BPM as a float.
     """
-    y, sr = librosa.load(path, sr=22050, mono=True)
+    y, sr = librosa.load(path, sr=22050, mono=True, dtype=np.float32)
     tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
     if isinstance(tempo, np.ndarray):
         tempo = tempo[0]
@@ -125,7 +470,7 @@ def load_audio_for_playback(path, sr=None):
     Returns:
         Tuple of (audio array [shape: (samples, channels)], sample rate).
     """
-    y, sr = librosa.load(path, sr=sr, mono=False)
+    y, sr = librosa.load(path, sr=sr, mono=False, dtype=np.float32)
     if y.ndim == 1:
         y = np.stack([y, y], axis=-1)
     else:
@@ -133,14 +478,72 @@ def load_audio_for_playback(path, sr=None):
     return y, sr
 
 
-def _lastone(iterable):
-    """Yield (item, is_last) for each element in iterable."""
-    it = iter(iterable)
-    last = next(it)
-    for val in it:
-        yield last, False
-        last = val
-    yield last, True
+def _segments(changes, bins_per_second, min_time):
+    """Merge label change points into segments of at least min_time.
+
+    Args:
+        changes: Sorted int32 frame indices where a new label starts.
+
+    Returns:
+        Tuple of int32 arrays (start_frames, end_frames, label_frames); the
+        label of each segment is the one at ``label_frame``.
+    """
+    n = changes.shape[0]
+    starts = np.empty(n, dtype=np.int32)
+    ends = np.empty(n, dtype=np.int32)
+    labels = np.empty(n, dtype=np.int32)
+    count = 0
+
+    before = 0
+    start = 0
+    before_time = 0.0
+    for j in range(n):
+        i = changes[j]
+        current_time = i / bins_per_second
+
+        if current_time - before_time < min_time:
+            before = i
+            continue
+
+        starts[count] = start
+        ends[count] = i
+        labels[count] = before
+        count += 1
+
+        start = i
+        before_time = current_time
+        before = i
+
+    return starts[:count], ends[:count], labels[:count]
+
+
+# Compiled when numba is available; the loop only visits change points, so
+# the plain Python version stays fast enough without it
+if njit is not None:
+    _segments = njit(cache=True)(_segments)
+
+
+def _key_segments(key, bins_per_second, min_time):
+    """Find key segment boundaries in a per-frame key label array.
+
+    The last frame always closes a segment.
+    """
+    changes = np.flatnonzero(key[1:] != key[:-1]) + 1
+    last = key.shape[0] - 1
+    if last > 0 and (changes.size == 0 or changes[-1] != last):
+        changes = np.append(changes, last)
+    return _segments(changes.astype(np.int32), bins_per_second, min_time)
+
+
+def _chord_segments(chord, bass, bins_per_second, min_time):
+    """Find chord segment boundaries in per-frame chord/bass label arrays.
+
+    A segment ends where either the chord or the bass label changes; the
+    final segment is left open, as in the original ChordAI implementation.
+    """
+    changes = np.flatnonzero(
+        (chord[1:] != chord[:-1]) | (bass[1:] != bass[:-1])) + 1
+    return _segments(changes.astype(np.int32), bins_per_second, min_time)
 
 
 def convert_time_key(pred, bins_per_second, min_time=0.1):
@@ -154,33 +557,57 @@ def convert_time_key(pred, bins_per_second, min_time=0.1):
     Returns:
         List of [start_time, end_time, key_name] entries.
     """
-    key = pred[2][0][0]
+    key = np.ascontiguousarray(pred[2][0][0], dtype=np.int32)
+    starts, ends, labels = _key_segments(
+        key, float(bins_per_second), float(min_time))
 
     times = []
-    before_key = key[0]
-    before_time = 0.0
-    nframes = len(key)
+    for start, end, label in zip(
+            starts.tolist(), ends.tolist(), labels.tolist()):
+        times.append([
+            round(start / bins_per_second, 3),
+            round(end / bins_per_second, 3),
+            KEY_NAMES[key[label]]
+        ])
 
-    for i, is_last in _lastone(range(1, nframes)):
-        if before_key != key[i] or is_last:
-            current_time = i / bins_per_second
+    return times
 
-            if current_time - before_time < min_time:
-                before_key = key[i]
-                continue
 
-            current_key = KEY_NAMES[before_key]
+@functools.lru_cache(maxsize=512)
+def _reconfigured(text):
+    """Return (name, bass interval) of ``Chord(text).reconfigured()``."""
+    chord = Chord(text).reconfigured()
+    return chord.name, chord.bass.get_interval()
 
-            times.append([
-                round(before_time, 3),
-                round(current_time, 3),
-                current_key
-            ])
 
-            before_time = current_time
-            before_key = key[i]
+@functools.lru_cache(maxsize=512)
+def _modified_accidentals_name(text, key):
+    """Return the name of ``Chord(text).modified_accidentals(key)``."""
+    return Chord(text).modified_accidentals(key).name
 
-    return times
+
+# Per chord_index lookup tables, keyed by id(chord_index)
+_CHORD_TABLES = {}
+
+
+def _chord_tables(chord_index):
+    """Return (labels, root_indices) lookup tables for chord_index.
+
+    ``labels[i]`` is ``chord_index[str(i)]`` (None for missing entries) and
+    ``root_indices`` maps each chord name to its ``_get_root_index``.
+    The tables are built once per chord_index object.
+    """
+    cached = _CHORD_TABLES.get(id(chord_index))
+    if cached is not None and cached[0] is chord_index:
+        return cached[1], cached[2]
+
+    size = 1 + max((int(k) for k in chord_index if k.isdigit()), default=-1)
+    labels = [chord_index.get(str(i)) for i in range(size)]
+    root_indices = {
+        name: _get_root_index(name) for name in chord_index.values()}
+
+    _CHORD_TABLES[id(chord_index)] = (chord_index, labels, root_indices)
+    return labels, root_indices
 
 
 def convert_time(pred, bins_per_second, chord_index, min_time=0.1):
@@ -195,57 +622,51 @@ def convert_time(pred, bins_per_second, chord_index, min_time=0.1):
     Returns:
         List of [start_time, end_time, chord_name] entries.
     """
-    chord = pred[1][0][0]
-    bass = pred[0][0][0]
+    chord = np.ascontiguousarray(pred[1][0][0], dtype=np.int32)
+    bass = np.ascontiguousarray(pred[0][0][0], dtype=np.int32)
+    starts, ends, labels = _chord_segments(
+        chord, bass, float(bins_per_second), float(min_time))
+    chord_labels, root_indices = _chord_tables(chord_index)
 
     times = []
-    before_chord = [chord[0], bass[0]]
-    before_time = 0.0
-    nframes = len(chord)
-
-    for i in range(1, nframes):
-        if (before_chord[0] != chord[i]) or (before_chord[1] != bass[i]):
-            current_time = i / bins_per_second
-
-            if current_time - before_time < min_time:
-                before_chord = [chord[i], bass[i]]
-                continue
-
-            current_chord = before_chord[0]
-            current_bass = before_chord[1]
-
-            try:
-                chord_text_ = chord_index[str(current_chord)]
-
-                if chord_text_ == "N.C.":
-                    raise ValueError()
+    for start, end, label in zip(
+            starts.tolist(), ends.tolist(), labels.tolist()):
+        current_chord = int(chord[label])
+        current_bass = int(bass[label])
+
+        chord_name = None
+        if 0 <= current_chord < len(chord_labels):
+            chord_name = chord_labels[current_chord]
+        if chord_name is None:
+            chord_name = chord_index[str(current_chord)]
+
+        try:
+            chord_text_ = chord_name
+
+            if chord_text_ == "N.C.":
+                raise ValueError()
+
+            if Chord is not None:
+                chord_text, bass_interval = _reconfigured(chord_text_)
+
+                if bass_interval != (current_bass - 1) and current_bass != 0:
+                    chord_text += "/" + TONES[current_bass - 1]
+                    chord_text = _reconfigured(chord_text)[0]
+            else:
+                chord_text = chord_text_
+                if current_bass != 0 and 0 <= current_bass - 1 < len(TONES):
+                    root_idx = root_indices.get(chord_text)
+                    if root_idx is not None and root_idx != (current_bass - 1):
+                        chord_text += "/" + TONES[current_bass - 1]
 
-                if Chord is not None:
-                    chord_temp = Chord(chord_text_).reconfigured()
-                    chord_text = chord_temp.name
+        except (ValueError, Exception):
+            chord_text = chord_name
 
-                    if chord_temp.bass.get_interval() != (
-                            current_bass - 1) and current_bass != 0:
-                        chord_text += "/" + TONES[current_bass - 1]
-                        chord_text = Chord(chord_text).reconfigured().name
-                else:
-                    chord_text = chord_text_
-                    if current_bass != 0 and 0 <= current_bass - 1 < len(TONES):
-                        root_idx = _get_root_index(chord_text)
-                        if root_idx is not None and root_idx != (current_bass - 1):
-                            chord_text += "/" + TONES[current_bass - 1]
-
-            except (ValueError, Exception):
-                chord_text = chord_index[str(current_chord)]
-
-            times.append([
-                round(before_time, 3),
-                round(current_time, 3),
-                chord_text
-            ])
-
-            before_time = current_time
-            before_chord = [chord[i], bass[i]]
+        times.append([
+            round(start / bins_per_second, 3),
+            round(end / bins_per_second, 3),
+            chord_text
+        ])
 
     return times
 
@@ -273,25 +694,26 @@ def modify_accidentals(chord_times, key_times):
     if Chord is None:
         return chord_times
 
+    # Key segments are sorted and contiguous, so the first one containing
+    # a chord start is the first whose end is not before it
+    keys = [key_time for key_time in key_times if key_time[2] != "N"]
+    key_starts = np.array([key_time[0] for key_time in keys], dtype=float)
+    key_ends = np.array([key_time[1] for key_time in keys], dtype=float)
+    chord_starts = np.array(
+        [chord_time[0] for chord_time in chord_times], dtype=float)
+    key_indices = np.searchsorted(key_ends, chord_starts, side='left')
+
     result = []
-    for chord_time in chord_times:
-        chord_start_time = chord_time[0]
+    for chord_time, k in zip(chord_times, key_indices.tolist()):
         modified_chord = chord_time[2]
 
-        if modified_chord != "N.C.":
-            for key_time in key_times:
-                if key_time[2] == "N":
-                    continue
-                start_time = key_time[0]
-                end_time = key_time[1]
-
-                if chord_start_time >= start_time and chord_start_time <= end_time:
-                    try:
-                        modified_chord = Chord(modified_chord).modified_accidentals(
-                            minor_key_to_major_key(key_time[2])).name
-                    except Exception:
-                        pass
-                    break
+        if (modified_chord != "N.C." and k < len(keys)
+                and key_starts[k] <= chord_time[0]):
+            try:
+                modified_chord = _modified_accidentals_name(
+                    modified_chord, minor_key_to_major_key(keys[k][2]))
+            except Exception:
+                pass
 
         result.append([
             chord_time[0],
@@ -302,18 +724,12 @@ def modify_accidentals(chord_times, key_times):
     return result
 
 
+_ROOT_IDX = {tone: i for i, tone in enumerate(TONES)}
+
+
 def _get_root_index(chord_name):
     """Extract root note index from chord name."""
-    if not chord_name or chord_name == "N.C.":
-        return None
-    if len(chord_name) >= 2 and chord_name[1] == 'b':
-        root = chord_name[:2]
-    else:
-        root = chord_name[0]
-    try:
-        return TONES.index(root)
-    except ValueError:
-        return None
+    return _ROOT_IDX.get(get_chord_root(chord_name))
 
 
 def get_chord_root(chord_name):
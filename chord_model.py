@@ -2,6 +2,7 @@
 import os
 import json
 import logging
+import threading
 import warnings
 
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
@@ -13,8 +14,34 @@ import tensorflow as tf
 tf.get_logger().setLevel(logging.ERROR)
 tf.autograph.set_verbosity(0)
 
-# Disable GPU (use CPU only, matching original ChordAI-python)
-tf.config.set_visible_devices([], 'GPU')
+# Set CHORDAI_FORCE_CPU=1 to hide GPUs (CPU only, as in original ChordAI-python)
+if os.environ.get('CHORDAI_FORCE_CPU') == '1':
+    tf.config.set_visible_devices([], 'GPU')
+else:
+    # Allocate GPU memory on demand instead of reserving nearly all of it at
+    # model load, so the optional nnAudio CQT can share the device
+    for _gpu in tf.config.list_physical_devices('GPU'):
+        try:
+            tf.config.experimental.set_memory_growth(_gpu, True)
+        except RuntimeError:
+            # The device was already initialized
+            pass
+
+# Set CHORDAI_TFLITE=1 (or int8) to run a dynamic-range int8 TFLite
+# conversion of the model for CPU inference, or CHORDAI_TFLITE=fp16 for
+# float16 weights; the file is created next to the SavedModel on first load
+TFLITE_MODE = {'1': 'int8', 'int8': 'int8', 'fp16': 'fp16'}.get(
+    os.environ.get('CHORDAI_TFLITE', ''))
+
+# Set CHORDAI_XLA=1 to compile the inference graph with XLA; it is compiled
+# once per segment count, and falls back to the plain graph on failure
+USE_XLA = os.environ.get('CHORDAI_XLA') == '1'
+
+# Set CHORDAI_SEGMENT_BATCH=1 to feed the padded song as a batch of
+# independent 8192-frame segments instead of one sequence. The BiLSTM
+# context and CRF decode then restart at every segment boundary, so the
+# output can differ from the default single-sequence input.
+SEGMENT_BATCH = os.environ.get('CHORDAI_SEGMENT_BATCH') == '1'
 
 MODEL_URL = (
     "https://huggingface.co/anime-song/ChordAI/resolve/main/"
@@ -32,9 +59,15 @@ class ChordModel:
             model_dir = os.path.join(base_dir, 'model', 'chordestimation')
 
         self.model_dir = model_dir
+        self.tflite_path = None
+        if TFLITE_MODE is not None:
+            self.tflite_path = (
+                model_dir.rstrip('/\\') + f'_{TFLITE_MODE}.tflite')
         self.index_path = os.path.join(base_dir, 'index.json')
 
         self.model = None
+        self._infer = None
+        self._load_lock = threading.Lock()
         self.chord_index = {}
         self._load_index()
 
@@ -44,9 +77,30 @@ class ChordModel:
 
     def _ensure_model(self):
         """Download model from Hugging Face if not present."""
-        if os.path.isdir(self.model_dir):
-            return
+        if not os.path.isdir(self.model_dir):
+            self._download_model()
+
+        if self.tflite_path and not os.path.exists(self.tflite_path):
+            if self._quantize_failed():
+                print("前回モデルの量子化に失敗したため、SavedModel を使用します。")
+            else:
+                self._quantize_model()
 
+    def _model_stamp(self):
+        """Identify the SavedModel on disk, to notice when it is replaced."""
+        pb_path = os.path.join(self.model_dir, 'saved_model.pb')
+        st = os.stat(pb_path if os.path.exists(pb_path) else self.model_dir)
+        return f"{st.st_mtime_ns}:{st.st_size}"
+
+    def _quantize_failed(self):
+        """Whether conversion already failed for the current SavedModel."""
+        try:
+            with open(self.tflite_path + '.failed', 'r', encoding='utf-8') as f:
+                return f.read() == self._model_stamp()
+        except OSError:
+            return False
+
+    def _download_model(self):
         import urllib.request
         import tarfile
 
@@ -66,38 +120,164 @@ class ChordModel:
 
         print("モデルの準備が完了しました。")
 
+    def _quantize_model(self):
+        """Convert the SavedModel to a quantized TFLite model.
+
+        In ``int8`` mode (dynamic range) weights are stored as int8 and the
+        dense/LSTM kernels run with int8 arithmetic on the CPU. In ``fp16``
+        mode weights are stored as float16, halving weight memory traffic
+        where the CPU delegate has float16 kernels. On failure the
+        SavedModel keeps being used, and a marker next to the .tflite path
+        skips the conversion until the SavedModel changes.
+        """
+        print("モデルを量子化しています...")
+        try:
+            converter = tf.lite.TFLiteConverter.from_saved_model(
+                self.model_dir)
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+            if TFLITE_MODE == 'fp16':
+                converter.target_spec.supported_types = [tf.float16]
+            converter.target_spec.supported_ops = [
+                tf.lite.OpsSet.TFLITE_BUILTINS,
+                tf.lite.OpsSet.SELECT_TF_OPS,
+            ]
+            tflite_model = converter.convert()
+        except Exception as e:
+            print(f"モデルの量子化に失敗しました: {e}")
+            try:
+                with open(self.tflite_path + '.failed', 'w',
+                          encoding='utf-8') as f:
+                    f.write(self._model_stamp())
+            except OSError:
+                pass
+            return
+
+        with open(self.tflite_path, 'wb') as f:
+            f.write(tflite_model)
+
     def load_model(self):
-        """Load the TF2 SavedModel via TFSMLayer (Keras 3 compatible)."""
+        """Load the TF2 SavedModel via TFSMLayer (Keras 3 compatible).
+
+        With ``CHORDAI_TFLITE`` set the quantized TFLite model is loaded
+        instead when it is available.
+        """
         self._ensure_model()
+        self._infer = None
+
+        if self.tflite_path and os.path.exists(self.tflite_path):
+            self.model = tf.lite.Interpreter(model_path=self.tflite_path)
+            return self.model
+
         import keras
         self.model = keras.layers.TFSMLayer(
             self.model_dir, call_endpoint='serving_default')
         return self.model
 
+    def ensure_loaded(self):
+        """Load the model once, safe to call from several threads."""
+        if self.model is None:
+            with self._load_lock:
+                if self.model is None:
+                    self.load_model()
+        return self.model
+
+    def _build_infer(self, jit_compile=False):
+        """Wrap the model call in a graph-compiled tf.function.
+
+        The three decoded outputs are stacked in the graph so that a single
+        host transfer fetches all of them. ``jit_compile`` enables XLA.
+        """
+        model = self.model
+        if isinstance(model, tf.lite.Interpreter):
+            return self._build_tflite_infer()
+
+        # (batch, frames, CQT bins, mid/side channels)
+        @tf.function(input_signature=[
+            tf.TensorSpec([1, None, 12 * 3 * 7, 2], tf.float32)],
+            jit_compile=jit_compile)
+        def infer(x):
+            # Min-max normalization over the whole song
+            x_min = tf.reduce_min(x)
+            denom = tf.reduce_max(x) - x_min
+            denom = tf.where(denom == 0, tf.ones_like(denom), denom)
+            x = (x - x_min) / denom
+            if SEGMENT_BATCH:
+                x = tf.reshape(x, [-1, 8192, 12 * 3 * 7, 2])
+            output = model(x)
+            return tf.stack([output['bc'], output['ccf'], output['kcrf']])
+
+        return infer
+
+    def _build_tflite_infer(self):
+        """Call the TFLite serving signature, stacking outputs like the graph."""
+        import numpy as np
+        runner = self.model.get_signature_runner('serving_default')
+        input_name = next(iter(runner.get_input_details()))
+
+        def infer(x):
+            x = np.asarray(x)
+            x_min = x.min()
+            denom = x.max() - x_min
+            if denom == 0:
+                denom = np.float32(1)
+            x = (x - x_min) / denom
+            if SEGMENT_BATCH:
+                x = x.reshape(-1, 8192, *x.shape[2:])
+            output = runner(**{input_name: x})
+            return np.stack([output['bc'], output['ccf'], output['kcrf']])
+
+        return infer
+
     def predict(self, spectrogram):
         """Run chord prediction on preprocessed spectrogram.
 
         Args:
-            spectrogram: Preprocessed CQT spectrogram array (already batched).
+            spectrogram: CQT spectrogram of shape (1, frames, n_bins, 2)
+                with frames a multiple of 8192, as returned by
+                ``preprocess``. It is min-max normalized inside the
+                inference graph.
 
         Returns:
             Raw model predictions: list of 3 outputs
             [bass, chord, key], each with argmax-decoded indices.
         """
-        if self.model is None:
-            self.load_model()
+        self.ensure_loaded()
+        use_xla = USE_XLA and not isinstance(self.model, tf.lite.Interpreter)
+        if self._infer is None:
+            self._infer = self._build_infer(jit_compile=use_xla)
 
         import numpy as np
-        input_tensor = tf.constant(spectrogram, dtype=tf.float32)
-        output = self.model(input_tensor)
+        input_tensor = tf.convert_to_tensor(spectrogram, dtype=tf.float32)
+        try:
+            output = np.asarray(self._infer(input_tensor))
+        except (tf.errors.InvalidArgumentError,
+                tf.errors.UnimplementedError) as e:
+            if not use_xla:
+                raise
+            # Ops without an XLA kernel: run the plain graph from now on
+            print(f"XLA コンパイルに失敗したため通常の推論に切り替えます: {e}")
+            self._infer = self._build_infer(jit_compile=False)
+            output = np.asarray(self._infer(input_tensor))
 
-        # TFSMLayer returns a dict with CRF-decoded outputs:
+        # The model returns CRF-decoded outputs:
         #   bc:   bass  indices (1, timesteps) int32
         #   ccf:  chord indices (1, timesteps) int32
         #   kcrf: key   indices (1, timesteps) int32
-        # Expand to (1, 1, timesteps) to match original format.
-        bass = np.expand_dims(output['bc'].numpy(), axis=1)
-        chord = np.expand_dims(output['ccf'].numpy(), axis=1)
-        key = np.expand_dims(output['kcrf'].numpy(), axis=1)
+        # ((segments, 8192) with CHORDAI_SEGMENT_BATCH, joined in order.)
+        # Reshape to (1, 1, timesteps) to match original format.
+        bass, chord, key = output.reshape(3, 1, 1, -1)
 
         return [bass, chord, key]
+
+
+_MODEL = None
+_MODEL_LOCK = threading.Lock()
+
+
+def get_model():
+    """Return the process-wide ChordModel, creating it on first use."""
+    global _MODEL
+    with _MODEL_LOCK:
+        if _MODEL is None:
+            _MODEL = ChordModel()
+    return _MODEL
@@ -1,4 +1,6 @@
 """Audio playback engine using sounddevice."""
+import threading
+
 import numpy as np
 import sounddevice as sd
 from PySide6.QtCore import QObject, Signal, QTimer
@@ -13,13 +15,15 @@ class AudioPlayer(QObject):
 
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.audio_data = None   # shape: (samples, channels) or (samples,)
+        self.audio_data = None   # int16, shape: (samples, channels) or (samples,)
+        self._audio_rev = None   # audio_data reversed, for reverse playback
         self.sr = 44100
         self._channels = 2
         self._position = 0        # in samples
         self._playing = False
         self._reverse = False
-        self._stream = None
+        self._stream = None       # kept open; outputs silence when stopped
+        self._lock = threading.Lock()   # guards _position/_reverse
         self._volume = 1.0        # 0.0 – 1.0
 
         # Timer for position updates (~30fps)
@@ -45,7 +49,10 @@ class AudioPlayer(QObject):
             sr: sample rate
         """
         self.stop()
-        self.audio_data = audio_data.astype(np.float32)
+        self._close_stream()
+        self.audio_data = self._to_int16(audio_data)
+        # Contiguous reversed copy so reverse chunks are plain forward slices
+        self._audio_rev = np.ascontiguousarray(self.audio_data[::-1])
         self.sr = sr
 
         # Determine channel count
@@ -56,6 +63,19 @@ class AudioPlayer(QObject):
 
         self._position = 0
 
+    @staticmethod
+    def _to_int16(audio_data):
+        """Store audio as int16; float input is taken to be in [-1, 1].
+
+        16-bit sources decoded to float (x / 32768) round-trip exactly.
+        """
+        if audio_data.dtype == np.int16:
+            return audio_data
+        scaled = np.multiply(audio_data, 32768.0, dtype=np.float32)
+        np.rint(scaled, out=scaled)
+        np.clip(scaled, -32768, 32767, out=scaled)
+        return scaled.astype(np.int16)
+
     @property
     def _num_samples(self):
         """Total number of samples."""
@@ -78,16 +98,26 @@ class AudioPlayer(QObject):
     @current_time.setter
     def current_time(self, t):
         """Set playback position in seconds."""
-        self._position = int(t * self.sr)
+        position = int(t * self.sr)
         if self.audio_data is not None:
-            self._position = max(0, min(self._position, self._num_samples))
+            position = max(0, min(position, self._num_samples))
+        with self._lock:
+            self._position = position
 
     def _audio_callback(self, outdata, frames, time_info, status):
         """Sounddevice callback for audio output."""
+        with self._lock:
+            self._fill_output(outdata, frames)
+
+    def _fill_output(self, outdata, frames):
+        """Write the next block into outdata and advance the position."""
         if self.audio_data is None or not self._playing:
             outdata.fill(0)
             return
 
+        # int16 samples are scaled back to float32 while applying the volume
+        gain = np.float32(self._volume / 32768.0)
+
         if self._reverse:
             start = self._position - frames
             if start < 0:
@@ -98,8 +128,9 @@ class AudioPlayer(QObject):
                     self._playing = False
                     return
                 chunk = self._get_chunk(0, self._position, reverse=True)
-                outdata[:chunk_len] = chunk * self._volume
-                outdata[chunk_len:] = 0
+                np.multiply(chunk, gain, out=outdata[:chunk_len],
+                            dtype=np.float32)
+                outdata[chunk_len:].fill(0)
                 self._position = 0
                 self._playing = False
                 return
@@ -115,15 +146,16 @@ class AudioPlayer(QObject):
                     self._playing = False
                     return
                 chunk = self._get_chunk(self._position, self._num_samples)
-                outdata[:chunk_len] = chunk * self._volume
-                outdata[chunk_len:] = 0
+                np.multiply(chunk, gain, out=outdata[:chunk_len],
+                            dtype=np.float32)
+                outdata[chunk_len:].fill(0)
                 self._position = self._num_samples
                 self._playing = False
                 return
             chunk = self._get_chunk(self._position, end)
             self._position = end
 
-        outdata[:] = chunk * self._volume
+        np.multiply(chunk, gain, out=outdata, dtype=np.float32)
 
     def _get_chunk(self, start, end, reverse=False):
         """Extract a chunk of audio data, ensuring correct shape for output.
@@ -134,33 +166,25 @@ class AudioPlayer(QObject):
             reverse: if True, reverse the chunk
 
         Returns:
-            numpy array of shape (frames, channels)
+            numpy array of shape (frames, channels), or a (frames, 1) view
+            for mono data
         """
-        if self.audio_data.ndim == 1:
-            # Mono data → expand to match output channels
-            chunk = self.audio_data[start:end]
-            if reverse:
-                chunk = chunk[::-1]
-            # Duplicate mono to all output channels
-            chunk = np.column_stack([chunk] * self._channels)
+        if reverse:
+            n = self._num_samples
+            chunk = self._audio_rev[n - end:n - start]
         else:
             chunk = self.audio_data[start:end]
-            if reverse:
-                chunk = chunk[::-1]
+
+        if chunk.ndim == 1:
+            # Column view; broadcasts to every output channel on write
+            chunk = chunk[:, np.newaxis]
         return chunk
 
-    def play(self):
-        """Start forward playback."""
-        if self.audio_data is None:
+    def _ensure_stream(self):
+        """Open the output stream on first use and keep it running."""
+        if self._stream is not None:
             return
 
-        self.stop()
-        self._playing = True
-        self._reverse = False
-
-        if self._position >= self._num_samples:
-            self._position = 0
-
         self._stream = sd.OutputStream(
             samplerate=self.sr,
             channels=self._channels,
@@ -169,64 +193,56 @@ class AudioPlayer(QObject):
             dtype='float32'
         )
         self._stream.start()
+
+    def _close_stream(self):
+        """Stop and close the output stream."""
+        if self._stream is not None:
+            try:
+                self._stream.stop()
+                self._stream.close()
+            except Exception:
+                pass
+            self._stream = None
+
+    def _start(self, reverse):
+        """Start playback in the given direction on the shared stream."""
+        with self._lock:
+            self._reverse = reverse
+            if reverse and self._position <= 0:
+                self._position = self._num_samples
+            elif not reverse and self._position >= self._num_samples:
+                self._position = 0
+            self._playing = True
+
+        self._ensure_stream()
         self._timer.start()
-        self.state_changed.emit('playing')
+        self.state_changed.emit('reverse' if reverse else 'playing')
 
-    def play_reverse(self):
-        """Start reverse playback."""
+    def play(self):
+        """Start forward playback."""
         if self.audio_data is None:
             return
 
-        self.stop()
-        self._playing = True
-        self._reverse = True
+        self._start(reverse=False)
 
-        if self._position <= 0:
-            self._position = self._num_samples
+    def play_reverse(self):
+        """Start reverse playback."""
+        if self.audio_data is None:
+            return
 
-        self._stream = sd.OutputStream(
-            samplerate=self.sr,
-            channels=self._channels,
-            callback=self._audio_callback,
-            blocksize=2048,
-            dtype='float32'
-        )
-        self._stream.start()
-        self._timer.start()
-        self.state_changed.emit('reverse')
+        self._start(reverse=True)
 
     def stop(self):
-        """Stop playback."""
+        """Stop playback (the stream stays open and outputs silence)."""
         self._playing = False
         self._timer.stop()
-
-        if self._stream is not None:
-            try:
-                self._stream.stop()
-                self._stream.close()
-            except Exception:
-                pass
-            self._stream = None
-
         self.state_changed.emit('stopped')
 
     def seek(self, time_sec):
         """Seek to a specific time in seconds."""
-        was_playing = self._playing
-        was_reverse = self._reverse
-
-        if was_playing:
-            self.stop()
-
         self.current_time = time_sec
         self.position_changed.emit(self.current_time)
 
-        if was_playing:
-            if was_reverse:
-                self.play_reverse()
-            else:
-                self.play()
-
     def _update_position(self):
         """Timer callback to emit position updates."""
         if not self._playing:
@@ -240,3 +256,4 @@ class AudioPlayer(QObject):
     def cleanup(self):
         """Clean up resources."""
         self.stop()
+        self._close_stream()
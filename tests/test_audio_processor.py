@@ -2,11 +2,23 @@ import pytest
 import numpy as np
 import sys
 import os
+import threading
+import time
 
 # プロジェクトルートにパスを通す
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import librosa
+
+import audio_processor
 from audio_processor import minmax, _get_root_index, convert_time, KEY_NAMES, TONES
+from audio_processor import convert_time_key
+from audio_processor import _librosa_cqt
+from audio_processor import process_folder
+from audio_processor import _chord_tables
+from audio_processor import modify_accidentals
+from audio_processor import _modified_accidentals_name
+from audio_processor import _segments
 
 def test_minmax():
     # 正常な[0, 1]に正規化されるかの確認
@@ -48,3 +60,213 @@ def test_convert_time(mocker):
     assert len(times) == 2  # C と G の2つのブロックに分かれるはず
     assert times[0] == [0.0, 0.3, "C"]  # frame0〜2が一つにまとまる
     assert times[1] == [0.3, 0.5, "G"]  # frame3のコード変化からframe5（終端での変化）まで
+
+def test_convert_time_key():
+    # キーは最終フレームでも区間を確定させる（コードとは異なる挙動）
+    key = np.array([[[1, 1, 1, 13, 13, 13]]])
+    pred = [None, None, key]
+
+    times = convert_time_key(pred, 10.0, min_time=0.0)
+    assert times == [[0.0, 0.3, "C"], [0.3, 0.5, "Am"]]
+
+    # min_time未満の区間は次の区間に吸収される
+    key2 = np.array([[[1, 1, 1, 2, 13, 13, 13, 13]]])
+    times2 = convert_time_key([None, None, key2], 10.0, min_time=0.15)
+    assert times2 == [[0.0, 0.3, "C"], [0.3, 0.7, "Am"]]
+
+def test_librosa_cqt_matches_librosa():
+    # フィルタバンクをキャッシュした実装が librosa.cqt と一致することを確認
+    sr = 22050
+    rng = np.random.default_rng(0)
+    y = (rng.standard_normal((2, sr * 2)) * 0.1).astype(np.float32)
+    filter_scale = (1 / 36) * 22.0
+
+    ref = librosa.cqt(
+        y, sr=sr, n_bins=252, bins_per_octave=36, hop_length=544,
+        filter_scale=filter_scale, fmin=32.7, scale=True, window="hann")
+    res = _librosa_cqt(y, sr, 252, 36, 544, 32.7, "hann", filter_scale)
+
+    assert res.shape == ref.shape
+    assert res.dtype == ref.dtype
+    assert np.allclose(res, ref)
+
+    # magnitude=True は複素数結果の絶対値と完全に一致する
+    mag = _librosa_cqt(
+        y, sr, 252, 36, 544, 32.7, "hann", filter_scale, magnitude=True)
+    assert mag.dtype == np.float32
+    assert np.array_equal(mag, np.abs(res))
+
+def test_cqt_backend_opt_in(mocker):
+    # CUDA が使えても CHORDAI_NNAUDIO を指定しない限り librosa を使う
+    fake_torch = mocker.MagicMock()
+    fake_torch.cuda.is_available.return_value = True
+    mocker.patch("audio_processor.torch", fake_torch)
+    mocker.patch("audio_processor.CQT2010v2", object())
+    mocker.patch("audio_processor._nnaudio_failed", False)
+
+    mocker.patch("audio_processor.USE_NNAUDIO", False)
+    assert audio_processor._default_cqt_backend() == "librosa"
+    mocker.patch("audio_processor.USE_NNAUDIO", True)
+    assert audio_processor._default_cqt_backend() == "nnaudio"
+
+def test_cqt_nnaudio_falls_back_to_librosa(mocker):
+    # GPU の CQT が失敗（CUDA のメモリ不足など）したら librosa で計算し直す
+    mocker.patch("audio_processor.torch", mocker.MagicMock())
+    mocker.patch("audio_processor._nnaudio_cqt",
+                 side_effect=RuntimeError("CUDA out of memory"))
+    mocker.patch("audio_processor._nnaudio_failed", False)
+    rng = np.random.default_rng(0)
+    y = (rng.standard_normal((2, 22050 * 2)) * 0.1).astype(np.float32)
+
+    res = audio_processor.cqt(y, hop_length=544, backend="nnaudio")
+    ref = audio_processor.cqt(y, hop_length=544, backend="librosa")
+
+    assert np.array_equal(res, ref)
+    # 以降は既定で librosa が選ばれる
+    assert audio_processor._nnaudio_failed is True
+    mocker.patch("audio_processor.USE_NNAUDIO", True)
+    assert audio_processor._default_cqt_backend() == "librosa"
+
+@pytest.mark.skipif(
+    audio_processor.CQT2010v2 is None
+    or not audio_processor.torch.cuda.is_available(),
+    reason="CHORDAI_NNAUDIO=1 と nnAudio・CUDA が必要")
+def test_nnaudio_cqt_matches_librosa():
+    # モデルが見る正規化後の入力で GPU 版と librosa 版が一致するか確認
+    sr = 22050
+    rng = np.random.default_rng(0)
+    y = (rng.standard_normal((2, sr * 5)) * 0.1).astype(np.float32)
+
+    kwargs = dict(sr=sr, n_bins=252, bins_per_octave=36, hop_length=544,
+                  Qfactor=22.0)
+    gpu = audio_processor.cqt(y, backend="nnaudio", **kwargs)
+    cpu = audio_processor.cqt(y, backend="librosa", **kwargs)
+
+    assert gpu.shape == cpu.shape
+    assert np.allclose(gpu, cpu, atol=1e-2)
+
+def test_process_folder(mocker):
+    # 読み込みと CQT をモック化し、パイプライン経由で入力順に推論されるか確認
+    mocker.patch("audio_processor._load_audio",
+                 side_effect=lambda path, sr, mono: (path, sr))
+    mocker.patch("audio_processor._compute_features",
+                 side_effect=lambda y, sr: ("S_" + y, 40.5, 1.0))
+
+    class FakeModel:
+        def predict(self, S):
+            return "pred_" + S
+
+    paths = ["a.wav", "b.wav", "c.wav", "d.wav"]
+    results = list(process_folder(paths, FakeModel()))
+
+    assert [r[0] for r in results] == paths
+    assert [r[1] for r in results] == ["pred_S_" + p for p in paths]
+    assert results[0][2:] == (40.5, 1.0)
+
+def test_process_folder_error(mocker):
+    # 途中のファイルで失敗した場合、そのファイルの順番で例外が送出されるか確認
+    def load(path, sr, mono):
+        if path == "bad.wav":
+            raise IOError("読み込み失敗")
+        return path, sr
+
+    mocker.patch("audio_processor._load_audio", side_effect=load)
+    mocker.patch("audio_processor._compute_features",
+                 side_effect=lambda y, sr: (y, 40.5, 1.0))
+
+    class FakeModel:
+        def predict(self, S):
+            return S
+
+    before = set(threading.enumerate())
+    paths = ["ok.wav", "bad.wav"] + [f"{i}.wav" for i in range(10)]
+    gen = process_folder(paths, FakeModel())
+    assert next(gen)[0] == "ok.wav"
+    with pytest.raises(IOError):
+        next(gen)
+
+    # 例外の送出後はステージのスレッドも終了する
+    _wait_for_stages(before)
+
+def _wait_for_stages(before, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        alive = set(threading.enumerate()) - before
+        if not alive:
+            return
+        time.sleep(0.01)
+    raise AssertionError(f"ステージが終了していない: {alive}")
+
+def test_process_folder_close_stops_stages(mocker):
+    # 途中で消費をやめても、満杯のキューで止まったままのスレッドが残らないか確認
+    mocker.patch("audio_processor._load_audio",
+                 side_effect=lambda path, sr, mono: (path, sr))
+    mocker.patch("audio_processor._compute_features",
+                 side_effect=lambda y, sr: (y, 40.5, 1.0))
+
+    class FakeModel:
+        def predict(self, S):
+            return S
+
+    before = set(threading.enumerate())
+    paths = [f"{i}.wav" for i in range(20)]
+    gen = process_folder(paths, FakeModel())
+    assert next(gen)[0] == "0.wav"
+    gen.close()
+    _wait_for_stages(before)
+
+def test_chord_tables():
+    # chord_index ごとに一度だけテーブルを作り、同じ辞書なら再利用するか確認
+    chord_index = {"0": "N.C.", "1": "C", "3": "Dbm7"}
+    labels, roots = _chord_tables(chord_index)
+    assert labels == ["N.C.", "C", None, "Dbm7"]
+    assert roots == {"N.C.": None, "C": 0, "Dbm7": 1}
+
+    labels2, _ = _chord_tables(chord_index)
+    assert labels2 is labels
+
+    # 別の辞書では別のテーブルになる
+    other_labels, _ = _chord_tables({"0": "N.C.", "1": "D"})
+    assert other_labels == ["N.C.", "D"]
+
+def test_modify_accidentals(mocker):
+    # どのキー区間で臨時記号が直されるかを確認するため Chord をモック化する
+    class FakeChord:
+        def __init__(self, name):
+            self.name = name
+
+        def modified_accidentals(self, key):
+            return FakeChord(f"{self.name}@{key}")
+
+    mocker.patch("audio_processor.Chord", FakeChord)
+    # 本物の Chord の結果がキャッシュに残らないようにする
+    _modified_accidentals_name.cache_clear()
+
+    key_times = [[0.0, 1.0, "N"], [1.0, 2.0, "Eb"], [2.0, 3.0, "Am"]]
+    chord_times = [
+        [0.5, 1.0, "C"],     # キーなし区間
+        [1.0, 2.0, "D"],     # 境界: N は飛ばして Eb
+        [2.0, 2.5, "E"],     # 境界: 先に見つかる Eb を使う
+        [2.5, 3.0, "N.C."],  # N.C. はそのまま
+        [3.5, 4.0, "F"],     # 区間外
+    ]
+    res = modify_accidentals(chord_times, key_times)
+    assert [c[2] for c in res] == ["C", "D@Eb", "E@Eb", "N.C.", "F"]
+    assert [c[:2] for c in res] == [c[:2] for c in chord_times]
+    _modified_accidentals_name.cache_clear()
+
+def test_segments_python_fallback():
+    # numba が無い環境で使う純 Python 版とコンパイル版の結果が一致するか確認
+    segments_py = getattr(_segments, "py_func", _segments)
+    changes = np.array([3, 4, 10, 11, 12, 30], dtype=np.int32)
+    for min_time in [0.0, 0.1, 1.0]:
+        expected = _segments(changes, 10.0, min_time)
+        result = segments_py(changes, 10.0, min_time)
+        for a, b in zip(expected, result):
+            assert np.array_equal(a, b)
+
+    # 0.15 秒未満の区間は次の区間に吸収される
+    starts, ends, labels = segments_py(changes, 10.0, 0.15)
+    assert starts.tolist() == [0, 3, 10, 12]
+    assert ends.tolist() == [3, 10, 12, 30]
+    assert labels.tolist() == [0, 4, 11, 12]
@@ -1,13 +1,25 @@
 """Main application window."""
+import functools
 import os
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 
 from PySide6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QLabel, QPushButton, QFileDialog, QProgressBar,
-    QFrame, QStatusBar, QMessageBox, QMenu
+    QFrame, QStatusBar, QMessageBox, QMenu, QApplication
+)
+from PySide6.QtCore import (
+    Qt, Signal, Slot, QThread, QTimer, QSettings, QEvent, QDeadlineTimer
 )
-from PySide6.QtCore import Qt, Signal, Slot, QThread
 
+from audio_processor import (
+    preprocess, convert_time, convert_time_key,
+    modify_accidentals, load_audio_for_playback,
+    estimate_tempo
+)
 from ui.waveform_widget import WaveformWidget
 from ui.timeline_widget import TimelineWidget
 from ui.player_controls import PlayerControls
@@ -22,43 +34,111 @@ class AnalysisWorker(QThread):
     progress = Signal(str)               # status message
     audio_loaded = Signal(object, int)   # audio_data, sample_rate
 
+    # Progress messages in the order they are emitted
+    STAGES = (
+        "音声ファイル読み込み中...",
+        "スペクトログラム計算中...",
+        "コード推定中...",
+        "タイムライン生成中...",
+        "アクシデンタル修正中...",
+        "テンポ推定中...",
+    )
+
     def __init__(self, filepath, chord_model):
         super().__init__()
         self.filepath = filepath
         self.chord_model = chord_model
 
     def run(self):
+        # Playback decode, CQT and model loading run concurrently; tempo
+        # estimation overlaps with inference. The pool is not joined on the
+        # way out, so errors and interruptions are reported right away
+        # instead of after a model download or a second decode.
+        executor = ThreadPoolExecutor(max_workers=3)
         try:
-            from audio_processor import (
-                preprocess, convert_time, convert_time_key,
-                modify_accidentals, load_audio_for_playback,
-                estimate_tempo
-            )
-
-            self.progress.emit("音声ファイル読み込み中...")
-            audio_data, sr = load_audio_for_playback(self.filepath)
+            prep_future = executor.submit(preprocess, self.filepath)
+            audio_future = executor.submit(
+                load_audio_for_playback, self.filepath)
+            model_future = executor.submit(self.chord_model.ensure_loaded)
+
+            self.progress.emit(self.STAGES[0])
+            audio_data, sr = audio_future.result()
             self.audio_loaded.emit(audio_data, sr)
 
-            self.progress.emit("スペクトログラム計算中...")
-            S, bins_per_second, duration = preprocess(self.filepath)
+            self.progress.emit(self.STAGES[1])
+            S, bins_per_second, duration = prep_future.result()
+            if self.isInterruptionRequested():
+                return
+            tempo_future = executor.submit(estimate_tempo, self.filepath)
 
-            self.progress.emit("コード推定中...")
+            self.progress.emit(self.STAGES[2])
+            model_future.result()
+            if self.isInterruptionRequested():
+                return
             pred = self.chord_model.predict(S)
+            if self.isInterruptionRequested():
+                return
 
-            self.progress.emit("タイムライン生成中...")
+            self.progress.emit(self.STAGES[3])
             chord_times = convert_time(pred, bins_per_second,
                                        self.chord_model.chord_index)
             key_times = convert_time_key(pred, bins_per_second)
 
-            self.progress.emit("アクシデンタル修正中...")
+            self.progress.emit(self.STAGES[4])
             chord_times = modify_accidentals(chord_times, key_times)
 
-            self.progress.emit("テンポ推定中...")
-            bpm = estimate_tempo(self.filepath)
+            self.progress.emit(self.STAGES[5])
+            bpm = tempo_future.result()
 
             self.finished.emit(chord_times, key_times, bpm)
         except Exception as e:
             self.error.emit(str(e))
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+class TextExportWorker(QThread):
+    """Background worker that writes the chord timeline as text."""
+
+    finished = Signal(str)   # filepath
+    error = Signal(str)
+
+    def __init__(self, bounds, chords, filepath):
+        super().__init__()
+        self.bounds = bounds          # (n, 2) float64 start/end seconds
+        self.chords = list(chords)
+        self.filepath = filepath
+
+    def run(self):
+        try:
+            # Round all timestamps at once (half to even, like round())
+            times_ms = np.rint(self.bounds * 1000).astype(np.int64)
+            text = "".join(
+                f"{start_ms}\t{end_ms}\t{chord}\n"
+                for (start_ms, end_ms), chord
+                in zip(times_ms.tolist(), self.chords))
+
+            with open(self.filepath, 'w', encoding='utf-8') as f:
+                f.write(text)
+
+            self.finished.emit(self.filepath)
+        except Exception as e:
+            self.error.emit(str(e))
+
+
+class ModelWarmupWorker(QThread):
+    """Background worker that loads the chord model ahead of first use."""
+
+    def run(self):
+        try:
+            from chord_model import get_model
+            model = get_model()
+            # Only warm up an already downloaded model; the download
+            # itself stays tied to the first analysis
+            if os.path.isdir(model.model_dir):
+                model.ensure_loaded()
+        except Exception:
+            pass   # errors surface again when the analysis loads it
 
 
 class MainWindow(QMainWindow):
@@ -76,19 +156,41 @@ class MainWindow(QMainWindow):
         self._chord_model = None
         self.chord_timeline = []
         self.key_timeline = []
+        self._set_segment_index([], [])
+        self._shown_chord = None
+        self._shown_key = None
+        self._shown_time = None
         self.current_filepath = None
         self._worker = None
+        self._export_worker = None
+
+        # Position updates are coalesced to at most one per display frame
+        self._pending_pos = None
+        self._ui_timer = QTimer(self)
+        self._ui_timer.setSingleShot(True)
+        self._ui_timer.setInterval(16)
+        self._ui_timer.timeout.connect(self._flush_position)
+
+        # Set once the window starts closing; if worker threads are still
+        # busy the close is retried until they have finished
+        self._closing = False
+        self._close_retry = QTimer(self)
+        self._close_retry.setInterval(100)
+        self._close_retry.timeout.connect(self.close)
 
         self._setup_ui()
         self._connect_signals()
 
+        self._warmup_worker = ModelWarmupWorker()
+        self._warmup_worker.start()
+
     # ── lazy model loading ──────────────────────────────────────
 
     @property
     def chord_model(self):
         if self._chord_model is None:
-            from chord_model import ChordModel
-            self._chord_model = ChordModel()
+            from chord_model import get_model
+            self._chord_model = get_model()
         return self._chord_model
 
     # ── UI Setup ────────────────────────────────────────────────
@@ -167,8 +269,11 @@ class MainWindow(QMainWindow):
         main_layout.addWidget(self.player_controls)
 
         # Progress bar (hidden by default)
+        # Determinate (one step per analysis stage): an indeterminate bar
+        # keeps repainting for the whole analysis
         self.progress_bar = QProgressBar()
-        self.progress_bar.setRange(0, 0)   # indeterminate
+        self.progress_bar.setRange(0, len(AnalysisWorker.STAGES))
+        self.progress_bar.setTextVisible(False)
         self.progress_bar.hide()
         main_layout.addWidget(self.progress_bar)
 
@@ -296,26 +401,43 @@ class MainWindow(QMainWindow):
         self.zoom_in_btn.clicked.connect(self._on_zoom_in)
         self.zoom_out_btn.clicked.connect(self._on_zoom_out)
 
+    # ── Last-used directory ─────────────────────────────────────
+
+    # Starting dialogs in the last folder avoids re-listing the home or
+    # working directory (slow on network drives) every time
+    @staticmethod
+    def _last_dir():
+        return QSettings("AI Chord Tracker", "AI Chord Tracker").value(
+            "last_dir", "", type=str)
+
+    @staticmethod
+    def _remember_dir(filepath):
+        QSettings("AI Chord Tracker", "AI Chord Tracker").setValue(
+            "last_dir", os.path.dirname(filepath))
+
     # ── Slots ───────────────────────────────────────────────────
 
     def _on_open_file(self):
         filepath, _ = QFileDialog.getOpenFileName(
             self,
             "音声ファイルを選択",
-            "",
+            self._last_dir(),
             "音声ファイル (*.wav *.mp3 *.ogg *.m4a);;All Files (*)"
         )
         if not filepath:
             return
+        self._remember_dir(filepath)
 
         self.current_filepath = filepath
 
         # Stop playback and reset position to 0
         self.player.stop()
         self.player_controls.set_playing(False)
+        self._pending_pos = None
         self._update_ui_position(0.0)
 
         self.open_button.setEnabled(False)
+        self.progress_bar.setValue(0)
         self.progress_bar.show()
         self.player_controls.setEnabled(False)
 
@@ -329,6 +451,8 @@ class MainWindow(QMainWindow):
     @Slot(str)
     def _on_progress(self, msg):
         self.status_bar.showMessage(msg)
+        if msg in AnalysisWorker.STAGES:
+            self.progress_bar.setValue(AnalysisWorker.STAGES.index(msg) + 1)
 
     @Slot(object, int)
     def _on_audio_loaded(self, audio_data, sr):
@@ -339,6 +463,7 @@ class MainWindow(QMainWindow):
     def _on_analysis_finished(self, chord_times, key_times, bpm):
         self.chord_timeline = chord_times
         self.key_timeline = key_times
+        self._set_segment_index(chord_times, key_times)
         self.current_bpm = bpm
         self.timeline_widget.set_chords(chord_times)
         self.timeline_widget.set_keys(key_times)
@@ -382,7 +507,7 @@ class MainWindow(QMainWindow):
         """Skip forward 5 seconds."""
         new_time = min(self.player.current_time + 5.0, self.player.duration)
         self.player.seek(new_time)
-        self._update_ui_position(new_time)
+        self._schedule_position(new_time)
 
     @Slot(float)
     def _on_volume_changed(self, vol):
@@ -391,11 +516,11 @@ class MainWindow(QMainWindow):
     @Slot(float)
     def _on_seek(self, time_sec):
         self.player.seek(time_sec)
-        self._update_ui_position(time_sec)
+        self._schedule_position(time_sec)
 
     @Slot(float)
     def _on_position_changed(self, time_sec):
-        self._update_ui_position(time_sec)
+        self._schedule_position(time_sec)
 
     @Slot()
     def _on_playback_finished(self):
@@ -403,7 +528,24 @@ class MainWindow(QMainWindow):
 
     # ── Helpers ─────────────────────────────────────────────────
 
+    def _schedule_position(self, time_sec):
+        """Queue a playhead update; only the latest one per frame is drawn."""
+        self._pending_pos = time_sec
+        if not self._ui_timer.isActive():
+            self._ui_timer.start()
+
+    def _flush_position(self):
+        if self._pending_pos is not None:
+            time_sec = self._pending_pos
+            self._pending_pos = None
+            self._update_ui_position(time_sec)
+
     def _update_ui_position(self, time_sec):
+        # Nothing is visible while minimized; keep only the slider in step
+        # and catch the rest up when the window is restored (changeEvent)
+        if not self.isVisible() or self.isMinimized():
+            self.player_controls.set_position(time_sec)
+            return
         self.waveform_widget.set_playhead(time_sec)
         self.timeline_widget.set_playhead(time_sec)
         self.player_controls.set_position(time_sec)
@@ -412,23 +554,60 @@ class MainWindow(QMainWindow):
 
     def _update_time_display(self, time_sec):
         duration = self.player.duration
-        self.time_display.setText(
-            f"{self._fmt(time_sec)} / {self._fmt(duration)}")
+        # Only re-format when a visible 0.1 s step changes
+        shown = (round(time_sec * 10), round(duration * 10))
+        if shown != self._shown_time:
+            self._shown_time = shown
+            self.time_display.setText(
+                f"{self._fmt(time_sec)} / {self._fmt(duration)}")
+
+    def _set_segment_index(self, chord_times, key_times):
+        """Split the timelines into parallel start/end/label arrays."""
+        self._chord_starts = [s for s, _, _ in chord_times]
+        self._chord_ends = [e for _, e, _ in chord_times]
+        self._chord_names = [c for _, _, c in chord_times]
+        self._chord_idx = -1
+        # NumPy copy of the bounds for vectorized consumers (text export);
+        # per-tick lookups stay on the lists, where bisect beats
+        # np.searchsorted on a scalar
+        self._chord_bounds = np.column_stack(
+            [self._chord_starts, self._chord_ends]).astype(np.float64)
+        self._key_starts = [s for s, _, _ in key_times]
+        self._key_ends = [e for _, e, _ in key_times]
+        self._key_names = [k for _, _, k in key_times]
+        self._key_idx = -1
+
+    @staticmethod
+    def _find_segment(starts, ends, time_sec, last):
+        """Index of the segment containing time_sec, or -1.
+
+        The last hit is checked first, so sequential playback is O(1).
+        """
+        if 0 <= last < len(starts) and starts[last] <= time_sec < ends[last]:
+            return last
+        i = bisect_right(starts, time_sec) - 1
+        if i >= 0 and time_sec < ends[i]:
+            return i
+        return -1
 
     def _update_current_chord(self, time_sec):
+        self._chord_idx = self._find_segment(
+            self._chord_starts, self._chord_ends, time_sec, self._chord_idx)
         chord = "---"
-        for s, e, c in self.chord_timeline:
-            if s <= time_sec < e:
-                chord = c
-                break
-        self.current_chord_label.setText(chord)
-
+        if self._chord_idx >= 0:
+            chord = self._chord_names[self._chord_idx]
+        if chord != self._shown_chord:
+            self._shown_chord = chord
+            self.current_chord_label.setText(chord)
+
+        self._key_idx = self._find_segment(
+            self._key_starts, self._key_ends, time_sec, self._key_idx)
         key = "---"
-        for s, e, k in self.key_timeline:
-            if s <= time_sec < e:
-                key = k if k != "N" else "---"
-                break
-        self.current_key_label.setText(key)
+        if self._key_idx >= 0 and self._key_names[self._key_idx] != "N":
+            key = self._key_names[self._key_idx]
+        if key != self._shown_key:
+            self._shown_key = key
+            self.current_key_label.setText(key)
 
     @Slot()
     def _on_export_text(self):
@@ -438,7 +617,7 @@ class MainWindow(QMainWindow):
             return
 
         # Default filename based on the audio file
-        default_name = ""
+        default_name = self._last_dir()
         if self.current_filepath:
             base = os.path.splitext(os.path.basename(self.current_filepath))[0]
             default_dir = os.path.dirname(self.current_filepath)
@@ -452,20 +631,33 @@ class MainWindow(QMainWindow):
         )
         if not filepath:
             return
+        self._remember_dir(filepath)
+
+        # Write off the GUI thread so slow drives do not freeze the UI. One
+        # export at a time: the action stays disabled until this one reports
+        # back, and the previous thread (already past its last emit) is
+        # joined before its reference is replaced.
+        if self._export_worker is not None:
+            self._export_worker.wait()
+        self.action_export_text.setEnabled(False)
+        self._export_worker = TextExportWorker(
+            self._chord_bounds, self._chord_names, filepath)
+        self._export_worker.finished.connect(self._on_export_text_finished)
+        self._export_worker.error.connect(self._on_export_text_error)
+        self._export_worker.start()
 
-        try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                for start, end, chord in self.chord_timeline:
-                    start_ms = int(round(start * 1000))
-                    end_ms = int(round(end * 1000))
-                    f.write(f"{start_ms}\t{end_ms}\t{chord}\n")
-
-            self.status_bar.showMessage(
-                f"テキスト出力完了: {os.path.basename(filepath)}")
-        except Exception as e:
-            QMessageBox.critical(
-                self, "エラー",
-                f"ファイルの保存に失敗しました:\n{e}")
+    @Slot(str)
+    def _on_export_text_finished(self, filepath):
+        self.action_export_text.setEnabled(True)
+        self.status_bar.showMessage(
+            f"テキスト出力完了: {os.path.basename(filepath)}")
+
+    @Slot(str)
+    def _on_export_text_error(self, err):
+        self.action_export_text.setEnabled(True)
+        QMessageBox.critical(
+            self, "エラー",
+            f"ファイルの保存に失敗しました:\n{err}")
 
     @Slot()
     def _on_export_midi(self):
@@ -475,7 +667,7 @@ class MainWindow(QMainWindow):
             return
 
         # Default filename based on the audio file
-        default_name = ""
+        default_name = self._last_dir()
         if self.current_filepath:
             base = os.path.splitext(os.path.basename(self.current_filepath))[0]
             default_dir = os.path.dirname(self.current_filepath)
@@ -489,6 +681,7 @@ class MainWindow(QMainWindow):
         )
         if not filepath:
             return
+        self._remember_dir(filepath)
 
         try:
             from midi_export import export_chords_to_midi
@@ -509,9 +702,10 @@ class MainWindow(QMainWindow):
 
     @staticmethod
     def _fmt(seconds):
-        m = int(seconds // 60)
-        s = seconds % 60
-        return f"{m}:{s:04.1f}"
+        # Integer deciseconds: no float formatting, and 59.96 s shows as
+        # 1:00.0 rather than 0:60.0
+        m, ds = divmod(int(round(seconds * 10)), 600)
+        return f"{m}:{ds // 10:02d}.{ds % 10}"
 
     # ── Zoom ────────────────────────────────────────────────────
 
@@ -528,6 +722,7 @@ class MainWindow(QMainWindow):
         self.zoom_label.setText(f"{int(zoom * 100)}%")
 
     @staticmethod
+    @functools.lru_cache(maxsize=1)
     def _zoom_button_style():
         return """
             QPushButton {
@@ -548,6 +743,74 @@ class MainWindow(QMainWindow):
             }
         """
 
+    def changeEvent(self, event):
+        if (event.type() == QEvent.Type.WindowStateChange
+                and not self.isMinimized()):
+            self._update_ui_position(self.player.current_time)
+        super().changeEvent(event)
+
     def closeEvent(self, event):
-        self.player.cleanup()
+        # Only the first attempt blocks (up to 2 s in total); retries just
+        # poll, since waiting on an expired deadline makes Qt log errors
+        deadline = None
+        if not self._closing:
+            self._closing = True
+            self._shut_down()
+            deadline = QDeadlineTimer(2000)
+
+        # Inference and model loading can't be interrupted mid-call. Rather
+        # than freezing the GUI until they return, hide the window and
+        # finish closing once the threads are done; the thread objects stay
+        # referenced until then.
+        threads = [t for t in (self._worker, self._export_worker,
+                               self._warmup_worker) if t is not None]
+        busy = False
+        for t in threads:
+            if not t.isRunning():
+                continue
+            remaining = 0
+            if deadline is not None:
+                remaining = deadline.remainingTime()
+            if remaining <= 0 or not t.wait(remaining):
+                busy = True
+                break
+        if busy:
+            event.ignore()
+            self.hide()
+            self._close_retry.start()
+            return
+        deferred = self._close_retry.isActive()
+        self._close_retry.stop()
+        self._worker = None
+        self._export_worker = None
+
+        # Drop the timelines so they can be freed promptly (the model itself
+        # is the process-wide instance from chord_model.get_model)
+        self.chord_timeline = []
+        self.key_timeline = []
         super().closeEvent(event)
+
+        # Closing an already hidden window doesn't count as the last window
+        # being closed, so quit the way Qt would have
+        app = QApplication.instance()
+        if (deferred and app.quitOnLastWindowClosed()
+                and not any(w.isVisible() for w in app.topLevelWidgets())):
+            app.quit()
+
+    def _shut_down(self):
+        """Detach workers and the player when the window starts closing."""
+        # Stop late emissions from reaching widgets that are being torn down,
+        # and don't keep inferring for a file nobody will look at
+        worker = self._worker
+        if worker is not None:
+            worker.progress.disconnect()
+            worker.audio_loaded.disconnect()
+            worker.finished.disconnect()
+            worker.error.disconnect()
+            worker.requestInterruption()
+            worker.quit()
+
+        self._ui_timer.stop()
+        self.player.position_changed.disconnect(self._on_position_changed)
+        self.player.playback_finished.disconnect(self._on_playback_finished)
+        self.player.cleanup()
@@ -1,6 +1,8 @@
 """Playback control widgets."""
+import functools
+
 from PySide6.QtWidgets import QWidget, QHBoxLayout, QPushButton, QSlider, QLabel, QVBoxLayout
-from PySide6.QtCore import Qt, Signal
+from PySide6.QtCore import Qt, Signal, QTimer, QSignalBlocker
 
 
 class PlayerControls(QWidget):
@@ -18,6 +20,15 @@ class PlayerControls(QWidget):
         self._duration = 0.0
         self._is_playing = False
         self._seeking = False
+        self._pending_seek_time = None
+        self._slider_value = 0   # last value set by set_position
+
+        # Emit drag seeks at most every 30 ms
+        self._seek_timer = QTimer(self)
+        self._seek_timer.setSingleShot(True)
+        self._seek_timer.setInterval(30)
+        self._seek_timer.timeout.connect(self._emit_pending_seek)
+
         self._setup_ui()
 
     def _setup_ui(self):
@@ -89,18 +100,28 @@ class PlayerControls(QWidget):
         self.seek_slider.sliderPressed.connect(self._on_slider_pressed)
         self.seek_slider.sliderReleased.connect(self._on_slider_released)
         self.seek_slider.sliderMoved.connect(self._on_slider_moved)
+        # User-driven changes (groove clicks, keys, drags) move the slider
+        # outside set_position; keep its cached step in sync
+        self.seek_slider.valueChanged.connect(self._on_slider_value_changed)
         self.volume_slider.valueChanged.connect(self._on_volume_changed)
 
     # ── public API ──────────────────────────────────────────────
 
     def set_duration(self, duration):
         self._duration = duration
+        # New file: the next set_position always moves the handle
+        self._slider_value = None
 
     def set_position(self, time_sec):
         """Update slider position (called by timer, not user)."""
         if not self._seeking and self._duration > 0:
             value = int((time_sec / self._duration) * 1000)
-            self.seek_slider.setValue(value)
+            # Most ticks stay within one of the 1000 slider steps
+            if value != self._slider_value:
+                self._slider_value = value
+                # Programmatic move: nothing listens for it, skip emission
+                with QSignalBlocker(self.seek_slider):
+                    self.seek_slider.setValue(value)
 
     def set_playing(self, is_playing):
         self._is_playing = is_playing
@@ -129,14 +150,26 @@ class PlayerControls(QWidget):
 
     def _on_slider_released(self):
         self._seeking = False
+        self._slider_value = self.seek_slider.value()
+        self._seek_timer.stop()
+        self._pending_seek_time = None
         if self._duration > 0:
             time_sec = (self.seek_slider.value() / 1000) * self._duration
             self.seek_requested.emit(time_sec)
 
+    def _on_slider_value_changed(self, value):
+        self._slider_value = value
+
     def _on_slider_moved(self, value):
         if self._duration > 0:
-            time_sec = (value / 1000) * self._duration
-            self.seek_requested.emit(time_sec)
+            self._pending_seek_time = (value / 1000) * self._duration
+            if not self._seek_timer.isActive():
+                self._seek_timer.start()
+
+    def _emit_pending_seek(self):
+        if self._pending_seek_time is not None:
+            self.seek_requested.emit(self._pending_seek_time)
+            self._pending_seek_time = None
 
     def _on_volume_changed(self, value):
         vol = value / 100.0
@@ -152,6 +185,7 @@ class PlayerControls(QWidget):
     # ── styles ──────────────────────────────────────────────────
 
     @staticmethod
+    @functools.lru_cache(maxsize=16)
     def _get_button_style(font_size=16, radius=22):
         return f"""
             QPushButton {{
@@ -1,4 +1,5 @@
 """Modern white theme stylesheet for the application."""
+from PySide6.QtGui import QColor
 
 # Color palette
 COLORS = {
@@ -51,6 +52,37 @@ CHORD_BORDER_COLORS = {
     'N.C.': '#D1D5DB',
 }
 
+# Key lane colors (major keys and their relative minors share a hue)
+KEY_COLORS = {
+    'C': '#EDE9FE', 'Db': '#E0E7FF', 'D': '#DBEAFE',
+    'Eb': '#D1FAE5', 'E': '#FEF3C7', 'F': '#FEE2E2',
+    'Gb': '#FCE7F3', 'G': '#E9D5FF', 'Ab': '#DDD6FE',
+    'A': '#CCFBF1', 'Bb': '#FBCFE8', 'B': '#FFE4E6',
+    'Am': '#EDE9FE', 'Bbm': '#E0E7FF', 'Bm': '#DBEAFE',
+    'Cm': '#D1FAE5', 'C#m': '#FEF3C7', 'Dm': '#FEE2E2',
+    'Ebm': '#FCE7F3', 'Em': '#E9D5FF', 'F#m': '#DDD6FE',
+    'Fm': '#CCFBF1', 'Gm': '#FBCFE8', 'G#m': '#FFE4E6',
+    'N': '#F3F4F6',
+}
+
+KEY_BORDER_COLORS = {
+    'C': '#C4B5FD', 'Db': '#A5B4FC', 'D': '#93C5FD',
+    'Eb': '#6EE7B7', 'E': '#FCD34D', 'F': '#FCA5A5',
+    'Gb': '#F9A8D4', 'G': '#C4B5FD', 'Ab': '#A78BFA',
+    'A': '#5EEAD4', 'Bb': '#F9A8D4', 'B': '#FDA4AF',
+    'Am': '#C4B5FD', 'Bbm': '#A5B4FC', 'Bm': '#93C5FD',
+    'Cm': '#6EE7B7', 'C#m': '#FCD34D', 'Dm': '#FCA5A5',
+    'Ebm': '#F9A8D4', 'Em': '#C4B5FD', 'F#m': '#A78BFA',
+    'Fm': '#5EEAD4', 'Gm': '#F9A8D4', 'G#m': '#FDA4AF',
+    'N': '#D1D5DB',
+}
+
+# Prebuilt QColor objects for painting, so paint events skip "#RRGGBB" parsing
+CHORD_QCOLORS = {k: QColor(v) for k, v in CHORD_COLORS.items()}
+CHORD_BORDER_QCOLORS = {k: QColor(v) for k, v in CHORD_BORDER_COLORS.items()}
+KEY_QCOLORS = {k: QColor(v) for k, v in KEY_COLORS.items()}
+KEY_BORDER_QCOLORS = {k: QColor(v) for k, v in KEY_BORDER_COLORS.items()}
+
 STYLESHEET = """
 /* ========== Global ========== */
 QWidget {
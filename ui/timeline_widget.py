@@ -1,33 +1,88 @@
 """Chord timeline display widget using QPainter with zoom & scroll."""
 import numpy as np
-from PySide6.QtWidgets import QWidget, QScrollArea, QVBoxLayout, QFrame
-from PySide6.QtCore import Qt, Signal, QRectF, QPointF
+from PySide6.QtWidgets import QWidget, QScrollArea, QFrame
+from PySide6.QtCore import (
+    Qt, Signal, QLine, QPoint, QRect, QRectF, QPointF, QSize
+)
 from PySide6.QtGui import (
     QPainter, QColor, QFont, QPen, QBrush,
-    QLinearGradient, QPolygonF
+    QLinearGradient, QPixmap
 )
 
-from ui.styles import CHORD_COLORS, CHORD_BORDER_COLORS
+from ui.styles import (
+    CHORD_QCOLORS, CHORD_BORDER_QCOLORS, KEY_QCOLORS, KEY_BORDER_QCOLORS
+)
 from audio_processor import get_chord_root
 
+# Chord roots as small integer ids into the color tables; 'N.C.' covers
+# anything without a known root
+_ROOTS = tuple(CHORD_QCOLORS)
+_ROOT_IDS = {root: i for i, root in enumerate(_ROOTS)}
+_NC_ID = _ROOT_IDS['N.C.']
+
+_FONT_CACHE = {}
+
+
+def _font(size, bold=False):
+    """Shared QFont per (size, bold), so painting never builds fonts."""
+    font = _FONT_CACHE.get((size, bold))
+    if font is None:
+        font = QFont('Segoe UI', size, QFont.Bold if bold else QFont.Normal)
+        _FONT_CACHE[size, bold] = font
+    return font
+
 
 class TimelineCanvas(QWidget):
     """Inner canvas that draws the timeline at the current zoom level."""
 
     position_clicked = Signal(float)  # time in seconds
 
+    _KEY_LANE_H = 18
+    _MARGIN_TOP = 4
+    _MARGIN_BOTTOM = 22
+    _TILE_W = 512  # width of the cached background tiles
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.chords = []
         self.keys = []
+        self._chord_starts = self._chord_ends = np.empty(0)
+        self._chord_root_ids = np.empty(0, np.int16)
+        self._key_starts = self._key_ends = np.empty(0)
+        self._blocks = None  # ((w, h), key_blocks, chord_blocks)
+        self._ticks = None  # (key, xs, lines, labels)
+        # Static layers (blocks, markers) rendered into column tiles on
+        # first exposure; only the playhead is drawn live
+        self._tiles = {}
+        self._tiles_key = None
         self.duration = 0.0
         self._playhead_time = 0.0
+        self._playhead_px = None  # x of the playhead as last painted
         self._zoom = 1.0
         self.setMinimumHeight(100)
         self.setCursor(Qt.PointingHandCursor)
 
+    @staticmethod
+    def _bounds(segments):
+        """Sorted start/end arrays used to cull segments outside the repaint."""
+        n = len(segments)
+        return (np.fromiter((s for s, _, _ in segments), np.float64, n),
+                np.fromiter((e for _, e, _ in segments), np.float64, n))
+
+    @staticmethod
+    def _visible_range(starts, ends, t_lo, t_hi):
+        """Index range of the segments overlapping [t_lo, t_hi]."""
+        return (int(np.searchsorted(ends, t_lo, 'left')),
+                int(np.searchsorted(starts, t_hi, 'right')))
+
     def set_chords(self, chords):
         self.chords = chords
+        self._chord_starts, self._chord_ends = self._bounds(chords)
+        self._chord_root_ids = np.fromiter(
+            (_ROOT_IDS.get(get_chord_root(c) or 'N.C.', _NC_ID)
+             for _, _, c in chords), np.int16, len(chords))
+        self._blocks = None
+        self._tiles = {}
         if chords:
             self.duration = max(end for _, end, _ in chords)
         elif self.keys:
@@ -39,13 +94,26 @@ class TimelineCanvas(QWidget):
 
     def set_keys(self, keys):
         self.keys = keys
+        self._key_starts, self._key_ends = self._bounds(keys)
+        self._blocks = None
+        self._tiles = {}
         if keys and not self.chords:
             self.duration = max(end for _, end, _ in keys)
         self.update()
 
     def set_playhead(self, time_sec):
         self._playhead_time = time_sec
-        self.update()
+        if not self.isVisible():
+            return  # painted in full when shown again
+        if self._playhead_px is None or self.duration <= 0:
+            self.update()
+            return
+        # Repaint only the strips under the old and new playhead; 8 px
+        # covers the shadow, the handle and antialiasing
+        px = int((time_sec / self.duration) * self.width())
+        lo = min(px, self._playhead_px) - 8
+        hi = max(px, self._playhead_px) + 9
+        self.update(QRect(lo, 0, hi - lo, self.height()))
 
     def set_zoom(self, zoom):
         self._zoom = max(1.0, min(zoom, 20.0))
@@ -65,122 +133,210 @@ class TimelineCanvas(QWidget):
         new_w = max(base_w, int(base_w * self._zoom))
         self.setFixedWidth(new_w)
 
+    def _layout_blocks(self, w, h):
+        """Rects, pens and brushes of every key and chord block at w x h.
+
+        Built once per data or size change so paintEvent only issues draw
+        calls. The lists run parallel to self.keys / self.chords (None for
+        undrawn 'N' keys) so they can be sliced by _visible_range.
+        """
+        key_lane_h = self._KEY_LANE_H
+        margin_top = self._MARGIN_TOP
+        chord_top = margin_top + key_lane_h + 2
+        block_height = h - chord_top - self._MARGIN_BOTTOM
+
+        key_blocks = []
+        key_x1s = (self._key_starts / self.duration) * w
+        key_x2s = (self._key_ends / self.duration) * w
+        key_widths = np.maximum(key_x2s - key_x1s, 2)
+        for x1, kw, (_, _, key) in zip(
+                key_x1s.tolist(), key_widths.tolist(), self.keys):
+            if key == 'N':
+                key_blocks.append(None)
+                continue
+            bg = KEY_QCOLORS.get(key, KEY_QCOLORS['N'])
+            border = KEY_BORDER_QCOLORS.get(key, KEY_BORDER_QCOLORS['N'])
+            text_rect = font = None
+            if kw > 24:
+                font = _font(8 if kw > 50 else 7, True)
+                text_rect = QRectF(x1 + 2, margin_top, kw - 4, key_lane_h)
+            key_blocks.append((QRectF(x1, margin_top, kw, key_lane_h),
+                               QPen(border, 1), QBrush(bg),
+                               text_rect, font, key))
+
+        # One pen/brush per root: the gradient is vertical, so it doesn't
+        # depend on the block's x and can be shared
+        styles = [None] * len(_ROOTS)
+        slivers = [None] * len(_ROOTS)
+        chord_blocks = []
+        x1s = (self._chord_starts / self.duration) * w
+        x2s = (self._chord_ends / self.duration) * w
+        widths = np.maximum(x2s - x1s, 2)
+        for x1, block_w, root_id, (_, _, chord) in zip(
+                x1s.tolist(), widths.tolist(),
+                self._chord_root_ids.tolist(), self.chords):
+            root = _ROOTS[root_id]
+            if block_w < 6:
+                # Slivers: a rounded, gradient rect is mostly antialiased
+                # border at this width anyway, so fill a pixel-aligned rect
+                # in a translucent border color instead
+                sliver = slivers[root_id]
+                if sliver is None:
+                    color = QColor(CHORD_BORDER_QCOLORS[root])
+                    color.setAlpha(150)
+                    sliver = slivers[root_id] = (None, color, root_id)
+                chord_blocks.append((
+                    QRect(int(x1), chord_top, max(1, int(block_w)), block_height),
+                    sliver, None, None, chord))
+                continue
+            style = styles[root_id]
+            if style is None:
+                bg_color = CHORD_QCOLORS[root]
+                gradient = QLinearGradient(0, chord_top, 0, chord_top + block_height)
+                gradient.setColorAt(0.0, bg_color)
+                bg_darker = QColor(bg_color)
+                bg_darker.setAlpha(200)
+                gradient.setColorAt(1.0, bg_darker)
+                style = styles[root_id] = (
+                    QPen(CHORD_BORDER_QCOLORS[root], 1), QBrush(gradient),
+                    root_id)
+
+            text_rect = font = None
+            if block_w > 28:
+                font = _font(10 if block_w > 60 else 8 if block_w > 40 else 7,
+                             True)
+                text_rect = QRectF(x1 + 3, chord_top, block_w - 6, block_height)
+            chord_blocks.append((QRectF(x1, chord_top, block_w, block_height),
+                                 style, text_rect, font, chord))
+        return key_blocks, chord_blocks
+
+    def _paint_static(self, painter, w, h, dirty):
+        """Draw the background, key lane, chord blocks and time markers."""
+        painter.fillRect(dirty, QColor('#FAFBFC'))
+
+        margin_bottom = self._MARGIN_BOTTOM
+        if self._blocks is None or self._blocks[0] != (w, h):
+            self._blocks = ((w, h), *self._layout_blocks(w, h))
+        _, key_blocks, chord_blocks = self._blocks
+
+        # Only segments overlapping the damaged rect are drawn (Qt clips
+        # the output to it anyway). The 3 px pad covers the 2 px minimum
+        # block width and the antialiased border.
+        px_time = self.duration / w
+        t_lo = (dirty.left() - 3) * px_time
+        t_hi = (dirty.right() + 3) * px_time
+
+        # Draw key lane
+        key_text = QColor('#6B21A8')
+        lo, hi = self._visible_range(
+            self._key_starts, self._key_ends, t_lo, t_hi)
+        for block in key_blocks[lo:hi]:
+            if block is None:
+                continue
+            rect, pen, brush, text_rect, font, key = block
+            painter.setPen(pen)
+            painter.setBrush(brush)
+            painter.drawRoundedRect(rect, 3, 3)
+            if text_rect is not None:
+                painter.setPen(key_text)
+                painter.setFont(font)
+                painter.drawText(text_rect, Qt.AlignCenter, key)
+
+        # Draw chord blocks
+        chord_text = QColor('#374151')
+        lo, hi = self._visible_range(
+            self._chord_starts, self._chord_ends, t_lo, t_hi)
+        visible = chord_blocks[lo:hi]
+        # Blocks grouped by color so pen and brush change once per root,
+        # then all labels with a single text pen
+        style = None
+        slivers = []
+        for block in sorted(visible, key=lambda b: b[1][2]):
+            if block[1][0] is None:
+                slivers.append(block)
+                continue
+            if block[1] is not style:
+                style = block[1]
+                painter.setPen(style[0])
+                painter.setBrush(style[1])
+            painter.drawRoundedRect(block[0], 4, 4)
+        if slivers:
+            painter.setRenderHint(QPainter.Antialiasing, False)
+            for rect, (_, color, _), _, _, _ in slivers:
+                painter.fillRect(rect, color)
+            painter.setRenderHint(QPainter.Antialiasing)
+        # Labels bucketed by font (at most three sizes), so setFont runs
+        # once per bucket instead of once per block
+        labels = {}
+        for _, _, text_rect, font, chord in visible:
+            if text_rect is not None:
+                labels.setdefault(font.pointSize(), (font, []))[1].append(
+                    (text_rect, chord))
+        painter.setPen(chord_text)
+        for size in sorted(labels):
+            font, items = labels[size]
+            painter.setFont(font)
+            for text_rect, chord in items:
+                painter.drawText(text_rect, Qt.AlignCenter, chord)
+
+        # Time markers
+        tick_xs, tick_lines, tick_labels = self._time_ticks(w, h)
+        # Labels extend right of their tick, so start well left of the rect
+        lo = int(np.searchsorted(tick_xs, dirty.left() - 48))
+        hi = int(np.searchsorted(tick_xs, dirty.right() + 3, 'right'))
+        painter.setPen(QPen(QColor('#D1D5DB'), 1))
+        painter.drawLines(tick_lines[lo:hi])
+        painter.setPen(QColor('#9CA3AF'))
+        painter.setFont(_font(7))
+        for x, label in zip(tick_xs[lo:hi].tolist(), tick_labels[lo:hi]):
+            painter.drawText(x + 2, h - 6, label)
+
+    def _time_ticks(self, w, h):
+        """Pixel x, tick line and label of every time marker, cached."""
+        interval = self._get_time_interval()
+        key = (w, h, interval, self.duration)
+        if self._ticks is None or self._ticks[0] != key:
+            ts = np.arange(int(self.duration // interval) + 1) * float(interval)
+            xs = ((ts / self.duration) * w).astype(np.int64)
+            y = h - self._MARGIN_BOTTOM
+            lines = [QLine(x, y, x, y + 3) for x in xs.tolist()]
+            labels = [f"{int(t // 60)}:{t % 60:04.1f}" for t in ts.tolist()]
+            self._ticks = (key, xs, lines, labels)
+        return self._ticks[1:]
+
     def paintEvent(self, event):
         painter = QPainter(self)
         painter.setRenderHint(QPainter.Antialiasing)
 
         w = self.width()
         h = self.height()
-
-        # Background
-        painter.fillRect(0, 0, w, h, QColor('#FAFBFC'))
+        dirty = event.rect()
 
         if not self.chords or self.duration <= 0:
+            painter.fillRect(dirty, QColor('#FAFBFC'))
             painter.setPen(QColor('#D1D5DB'))
-            painter.setFont(QFont('Segoe UI', 11))
+            painter.setFont(_font(11))
             painter.drawText(QRectF(0, 0, w, h), Qt.AlignCenter,
                              "コード解析結果がここに表示されます")
             return
 
-        key_lane_h = 18
-        margin_top = 4
-        margin_bottom = 22
-        chord_top = margin_top + key_lane_h + 2
-        block_height = h - chord_top - margin_bottom
-
-        # Draw key lane
-        if self.keys:
-            key_colors = {
-                'C': '#EDE9FE', 'Db': '#E0E7FF', 'D': '#DBEAFE',
-                'Eb': '#D1FAE5', 'E': '#FEF3C7', 'F': '#FEE2E2',
-                'Gb': '#FCE7F3', 'G': '#E9D5FF', 'Ab': '#DDD6FE',
-                'A': '#CCFBF1', 'Bb': '#FBCFE8', 'B': '#FFE4E6',
-                'Am': '#EDE9FE', 'Bbm': '#E0E7FF', 'Bm': '#DBEAFE',
-                'Cm': '#D1FAE5', 'C#m': '#FEF3C7', 'Dm': '#FEE2E2',
-                'Ebm': '#FCE7F3', 'Em': '#E9D5FF', 'F#m': '#DDD6FE',
-                'Fm': '#CCFBF1', 'Gm': '#FBCFE8', 'G#m': '#FFE4E6',
-                'N': '#F3F4F6',
-            }
-            key_border_colors = {
-                'C': '#C4B5FD', 'Db': '#A5B4FC', 'D': '#93C5FD',
-                'Eb': '#6EE7B7', 'E': '#FCD34D', 'F': '#FCA5A5',
-                'Gb': '#F9A8D4', 'G': '#C4B5FD', 'Ab': '#A78BFA',
-                'A': '#5EEAD4', 'Bb': '#F9A8D4', 'B': '#FDA4AF',
-                'Am': '#C4B5FD', 'Bbm': '#A5B4FC', 'Bm': '#93C5FD',
-                'Cm': '#6EE7B7', 'C#m': '#FCD34D', 'Dm': '#FCA5A5',
-                'Ebm': '#F9A8D4', 'Em': '#C4B5FD', 'F#m': '#A78BFA',
-                'Fm': '#5EEAD4', 'Gm': '#F9A8D4', 'G#m': '#FDA4AF',
-                'N': '#D1D5DB',
-            }
-            for start, end, key in self.keys:
-                if key == 'N':
-                    continue
-                x1 = (start / self.duration) * w
-                x2 = (end / self.duration) * w
-                kw = max(x2 - x1, 2)
-
-                bg = key_colors.get(key, '#F3F4F6')
-                border = key_border_colors.get(key, '#D1D5DB')
-
-                rect = QRectF(x1, margin_top, kw, key_lane_h)
-                painter.setPen(QPen(QColor(border), 1))
-                painter.setBrush(QBrush(QColor(bg)))
-                painter.drawRoundedRect(rect, 3, 3)
-
-                if kw > 24:
-                    painter.setPen(QColor('#6B21A8'))
-                    font_size = 8 if kw > 50 else 7
-                    painter.setFont(QFont('Segoe UI', font_size, QFont.Bold))
-                    text_rect = QRectF(x1 + 2, margin_top, kw - 4, key_lane_h)
-                    painter.drawText(text_rect, Qt.AlignCenter, key)
-
-        # Draw chord blocks
-        for start, end, chord in self.chords:
-            x1 = (start / self.duration) * w
-            x2 = (end / self.duration) * w
-            block_w = max(x2 - x1, 2)
-
-            root = get_chord_root(chord) or 'N.C.'
-            bg_color = CHORD_COLORS.get(root, '#F3F4F6')
-            border_color = CHORD_BORDER_COLORS.get(root, '#D1D5DB')
-
-            rect = QRectF(x1, chord_top, block_w, block_height)
-            gradient = QLinearGradient(x1, chord_top, x1, chord_top + block_height)
-            gradient.setColorAt(0.0, QColor(bg_color))
-            bg_darker = QColor(bg_color)
-            bg_darker.setAlpha(200)
-            gradient.setColorAt(1.0, bg_darker)
-
-            painter.setPen(QPen(QColor(border_color), 1))
-            painter.setBrush(QBrush(gradient))
-            painter.drawRoundedRect(rect, 4, 4)
-
-            if block_w > 28:
-                painter.setPen(QColor('#374151'))
-                font_size = 10 if block_w > 60 else 8 if block_w > 40 else 7
-                font = QFont('Segoe UI', font_size, QFont.Bold)
-                painter.setFont(font)
-                text_rect = QRectF(x1 + 3, chord_top, block_w - 6, block_height)
-                painter.drawText(text_rect, Qt.AlignCenter, chord)
-
-        # Time markers
-        painter.setPen(QColor('#9CA3AF'))
-        painter.setFont(QFont('Segoe UI', 7))
-        interval = self._get_time_interval()
-        t = 0.0
-        while t <= self.duration:
-            x = (t / self.duration) * w
-            painter.setPen(QPen(QColor('#D1D5DB'), 1))
-            painter.drawLine(int(x), h - margin_bottom, int(x), h - margin_bottom + 3)
-            painter.setPen(QColor('#9CA3AF'))
-            mins = int(t // 60)
-            secs = t % 60
-            painter.drawText(int(x) + 2, h - 6, f"{mins}:{secs:04.1f}")
-            t += interval
+        dpr = self.devicePixelRatioF()
+        tiles_key = (w, h, dpr, self._zoom)
+        if tiles_key != self._tiles_key:
+            self._tiles = {}
+            self._tiles_key = tiles_key
+        tile_w = self._TILE_W
+        for i in range(dirty.left() // tile_w, dirty.right() // tile_w + 1):
+            tile = self._tiles.get(i)
+            if tile is None:
+                tile = self._tiles[i] = self._render_tile(i, w, h, dpr)
+            painter.drawPixmap(QPoint(i * tile_w, 0), tile)
 
         # Playhead
-        if self._playhead_time >= 0 and self.duration > 0:
+        self._playhead_px = None
+        if self._playhead_time >= 0:
             px = (self._playhead_time / self.duration) * w
+            self._playhead_px = int(px)
 
             painter.setPen(QPen(QColor(239, 68, 68, 40), 6))
             painter.drawLine(int(px), 0, int(px), h)
@@ -192,6 +348,18 @@ class TimelineCanvas(QWidget):
             painter.setPen(QPen(QColor('#FFFFFF'), 2))
             painter.drawEllipse(QPointF(px, 6), 5, 5)
 
+    def _render_tile(self, i, w, h, dpr):
+        x0 = i * self._TILE_W
+        tile_w = min(self._TILE_W, w - x0)
+        tile = QPixmap(QSize(int(np.ceil(tile_w * dpr)), int(np.ceil(h * dpr))))
+        tile.setDevicePixelRatio(dpr)
+        painter = QPainter(tile)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.translate(-x0, 0)
+        self._paint_static(painter, w, h, QRect(x0, 0, tile_w, h))
+        painter.end()
+        return tile
+
     def _get_time_interval(self):
         visible_duration = self.duration / self._zoom
         if visible_duration <= 5:
@@ -230,22 +398,30 @@ class TimelineWidget(QScrollArea):
         self.setWidget(self._canvas)
 
         self._canvas.position_clicked.connect(self.position_clicked)
+        # (px_per_sec, viewport_w, margin); cleared whenever canvas or
+        # viewport geometry may change
+        self._scroll_geom = None
 
     def set_chords(self, chords):
         self._canvas.set_chords(chords)
+        self._scroll_geom = None
 
     def set_keys(self, keys):
         self._canvas.set_keys(keys)
+        self._scroll_geom = None
 
     def set_playhead(self, time_sec):
         self._canvas.set_playhead(time_sec)
-        self._auto_scroll(time_sec)
+        if self.isVisible():
+            self._auto_scroll(time_sec)
 
     def zoom_in(self):
         self._canvas.set_zoom(self._canvas.get_zoom() * 1.5)
+        self._scroll_geom = None
 
     def zoom_out(self):
         self._canvas.set_zoom(self._canvas.get_zoom() / 1.5)
+        self._scroll_geom = None
 
     def get_zoom(self):
         return self._canvas.get_zoom()
@@ -253,20 +429,30 @@ class TimelineWidget(QScrollArea):
     def resizeEvent(self, event):
         super().resizeEvent(event)
         self._canvas._update_size()
+        self._scroll_geom = None
 
     def _auto_scroll(self, time_sec):
         """Keep playhead visible during playback."""
-        if self._canvas.duration <= 0:
-            return
-        canvas_w = self._canvas.width()
-        px = (time_sec / self._canvas.duration) * canvas_w
-        viewport_w = self.viewport().width()
+        geom = self._scroll_geom
+        if geom is None:
+            if self._canvas.duration <= 0:
+                return
+            viewport_w = self.viewport().width()
+            geom = self._scroll_geom = (
+                self._canvas.width() / self._canvas.duration,
+                viewport_w, viewport_w * 0.15)
+        px_per_sec, viewport_w, margin = geom
+        px = time_sec * px_per_sec
         scroll_bar = self.horizontalScrollBar()
 
-        # Scroll if playhead is near edges
+        # Most ticks land well inside the viewport; nothing to do then
         visible_left = scroll_bar.value()
-        visible_right = visible_left + viewport_w
-        margin = viewport_w * 0.15
+        if visible_left + margin <= px <= visible_left + viewport_w - margin:
+            return
 
-        if px < visible_left + margin or px > visible_right - margin:
-            scroll_bar.setValue(int(px - viewport_w / 2))
+        # Clamp first so a pinned scrollbar isn't re-set (and the
+        # viewport re-invalidated) on every tick
+        value = min(max(int(px - viewport_w / 2), scroll_bar.minimum()),
+                    scroll_bar.maximum())
+        if value != visible_left:
+            scroll_bar.setValue(value)
@@ -1,8 +1,10 @@
 """Waveform display widget using QPainter."""
 import numpy as np
 from PySide6.QtWidgets import QWidget
-from PySide6.QtCore import Qt, Signal, QRectF, QPointF
-from PySide6.QtGui import QPainter, QColor, QPen, QFont, QLinearGradient, QPolygonF
+from PySide6.QtCore import Qt, Signal, QLine, QRect, QRectF, QPointF, QSize
+from PySide6.QtGui import (
+    QPainter, QColor, QPen, QFont, QLinearGradient, QPolygonF, QPixmap
+)
 
 
 class WaveformWidget(QWidget):
@@ -13,54 +15,147 @@ class WaveformWidget(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.audio_data = None
-        self._display_data = None
         self.sr = 22050
         self.duration = 0.0
         self._playhead_time = 0.0
+        self._playhead_px = None  # x of the playhead as last painted
         self._peaks_pos = None
         self._peaks_neg = None
+        # Everything but the playhead, re-rendered only when the audio or
+        # size changes
+        self._static_pixmap = None
+        self._static_key = None
         self.setMinimumHeight(120)
         self.setCursor(Qt.PointingHandCursor)
 
     def set_audio(self, audio_data, sr):
         """Set audio data and precompute peaks for display."""
-        # Convert stereo to mono for waveform display
-        if audio_data.ndim == 2:
-            self._display_data = np.mean(audio_data, axis=1)
-        else:
-            self._display_data = audio_data
         self.audio_data = audio_data
         self.sr = sr
-        self.duration = len(self._display_data) / sr
+        self.duration = len(audio_data) / sr
         self._compute_peaks()
+        self._static_pixmap = None
         self.update()
 
+    # Samples downmixed at a time, so stereo input never needs a full-length
+    # mono copy
+    _CHUNK_SAMPLES = 1 << 18
+
+    @staticmethod
+    def _mono(block):
+        """Channel mean of a (n, channels) block as float32."""
+        mono = block[:, 0].astype(np.float32)
+        for c in range(1, block.shape[1]):
+            np.add(mono, block[:, c], out=mono, dtype=np.float32)
+        mono /= np.float32(block.shape[1])
+        return mono
+
     def _compute_peaks(self):
         """Precompute positive and negative peaks for efficient rendering."""
-        if self._display_data is None:
+        data = self.audio_data
+        if data is None:
             return
 
-        data_1d = self._display_data
-        num_bins = min(2000, len(data_1d))
-        samples_per_bin = max(1, len(data_1d) // num_bins)
-        n = samples_per_bin * num_bins
-        data = data_1d[:n].reshape(num_bins, samples_per_bin)
-        self._peaks_pos = np.max(data, axis=1)
-        self._peaks_neg = np.min(data, axis=1)
+        total = len(data)
+        num_bins = min(2000, total)
+        samples_per_bin = max(1, total // num_bins)
+        # reduceat takes the last bin to the end of the buffer, so trailing
+        # samples are no longer dropped
+        starts = np.arange(num_bins) * samples_per_bin
+        if data.ndim == 1:
+            data_1d = data.astype(np.float32, copy=False)
+            peaks_pos = np.maximum.reduceat(data_1d, starts)
+            peaks_neg = np.minimum.reduceat(data_1d, starts)
+        else:
+            # Downmix in runs of whole bins; the last run again extends to
+            # the end of the buffer
+            peaks_pos = np.empty(num_bins, np.float32)
+            peaks_neg = np.empty(num_bins, np.float32)
+            step = max(1, self._CHUNK_SAMPLES // samples_per_bin)
+            for b0 in range(0, num_bins, step):
+                b1 = min(b0 + step, num_bins)
+                s0 = starts[b0]
+                s1 = starts[b1] if b1 < num_bins else total
+                mono = self._mono(data[s0:s1])
+                idx = starts[b0:b1] - s0
+                peaks_pos[b0:b1] = np.maximum.reduceat(mono, idx)
+                peaks_neg[b0:b1] = np.minimum.reduceat(mono, idx)
+
+        # Store as int16 already normalized to the display range (10%
+        # headroom), so painting needs no per-rebuild amplitude scan
+        max_amp = max(np.abs(peaks_pos).max(initial=0.0),
+                      np.abs(peaks_neg).max(initial=0.0)) * 1.1
+        if max_amp < 1e-8:
+            max_amp = 1.0
+        scale = np.float32(32767 / max_amp)
+        self._peaks_pos = np.rint(peaks_pos * scale).astype(np.int16)
+        self._peaks_neg = np.rint(peaks_neg * scale).astype(np.int16)
 
     def set_playhead(self, time_sec):
         """Update playhead position."""
         self._playhead_time = time_sec
-        self.update()
+        if not self.isVisible():
+            return  # painted in full when shown again
+        if self._playhead_px is None or self.duration <= 0:
+            self.update()
+            return
+        # Repaint only the strips under the old and new playhead; 8 px
+        # covers the shadow, the handle and antialiasing
+        px = int((time_sec / self.duration) * self.width())
+        lo = min(px, self._playhead_px) - 8
+        hi = max(px, self._playhead_px) + 9
+        self.update(QRect(lo, 0, hi - lo, self.height()))
 
     def paintEvent(self, event):
-        """Draw the waveform."""
+        """Draw the cached waveform, then the playhead on top."""
         painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
 
         w = self.width()
         h = self.height()
         margin_bottom = 20
+        self._playhead_px = None
+
+        dpr = self.devicePixelRatioF()
+        pixmap = self._static_pixmap
+        if pixmap is None or self._static_key != (w, h, dpr):
+            pixmap = QPixmap(QSize(int(np.ceil(w * dpr)), int(np.ceil(h * dpr))))
+            pixmap.setDevicePixelRatio(dpr)
+            static_painter = QPainter(pixmap)
+            static_painter.setRenderHint(QPainter.Antialiasing)
+            self._paint_static(static_painter, w, h)
+            static_painter.end()
+            self._static_pixmap = pixmap
+            self._static_key = (w, h, dpr)
+        painter.drawPixmap(0, 0, pixmap)
+
+        # Playhead
+        if (self._peaks_pos is not None and self.duration > 0
+                and self._playhead_time >= 0):
+            painter.setRenderHint(QPainter.Antialiasing)
+            px = (self._playhead_time / self.duration) * w
+            self._playhead_px = int(px)
+
+            # Playhead shadow
+            painter.setPen(QPen(QColor(239, 68, 68, 40), 6))
+            painter.drawLine(int(px), 0, int(px), h - margin_bottom)
+
+            # Playhead line
+            painter.setPen(QPen(QColor('#EF4444'), 2))
+            painter.drawLine(int(px), 0, int(px), h - margin_bottom)
+
+            # Playhead handle (triangle at top)
+            painter.setBrush(QColor('#EF4444'))
+            painter.setPen(Qt.NoPen)
+            triangle = QPolygonF([
+                QPointF(px - 5, 0),
+                QPointF(px + 5, 0),
+                QPointF(px, 8),
+            ])
+            painter.drawPolygon(triangle)
+
+    def _paint_static(self, painter, w, h):
+        """Draw the background, border, waveform bars and time markers."""
+        margin_bottom = 20
 
         # Background
         painter.fillRect(0, 0, w, h, QColor('#FAFBFC'))
@@ -78,74 +173,46 @@ class WaveformWidget(QWidget):
             return
 
         mid_y = (h - margin_bottom) / 2
-        max_amp = max(
-            np.max(np.abs(self._peaks_pos)),
-            np.max(np.abs(self._peaks_neg))
-        ) * 1.1
-
-        if max_amp < 1e-8:
-            max_amp = 1.0
 
+        # Fill the whole envelope as one polygon: tops left to right, then
+        # bottoms back, with a single gradient instead of one per bar
         num_bins = len(self._peaks_pos)
-        bar_width = max(1, w / num_bins)
-
-        # Draw waveform bars
-        for i in range(num_bins):
-            x = (i / num_bins) * w
-            y_top = mid_y - (self._peaks_pos[i] / max_amp) * (mid_y - 8)
-            y_bottom = mid_y - (self._peaks_neg[i] / max_amp) * (mid_y - 8)
-
-            # Gradient fill
-            gradient = QLinearGradient(x, y_top, x, y_bottom)
-            gradient.setColorAt(0.0, QColor('#93C5FD'))
-            gradient.setColorAt(0.5, QColor('#3B82F6'))
-            gradient.setColorAt(1.0, QColor('#93C5FD'))
-
-            painter.setPen(Qt.NoPen)
-            painter.setBrush(gradient)
-            bar_h = max(1, y_bottom - y_top)
-            painter.drawRoundedRect(QRectF(x, y_top, bar_width + 0.5, bar_h), 1, 1)
+        xs = (np.arange(num_bins) + 0.5) * (w / num_bins)
+        scale = (mid_y - 8) / 32767  # peaks are int16, full scale = max_amp
+        y_top = mid_y - self._peaks_pos * scale
+        y_bottom = np.maximum(mid_y - self._peaks_neg * scale, y_top + 1)
+        outline = QPolygonF(
+            [QPointF(x, y) for x, y in zip(xs.tolist(), y_top.tolist())]
+            + [QPointF(x, y) for x, y in zip(xs[::-1].tolist(),
+                                             y_bottom[::-1].tolist())])
+
+        gradient = QLinearGradient(0, 8, 0, 2 * mid_y - 8)
+        gradient.setColorAt(0.0, QColor('#93C5FD'))
+        gradient.setColorAt(0.5, QColor('#3B82F6'))
+        gradient.setColorAt(1.0, QColor('#93C5FD'))
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(gradient)
+        painter.drawPolygon(outline)
 
         # Center line
         painter.setPen(QPen(QColor('#E4E7EB'), 1, Qt.DashLine))
         painter.drawLine(0, int(mid_y), w, int(mid_y))
 
         # Time markers
+        if self.duration > 0:
+            interval = self._get_time_interval()
+            ts = np.arange(int(self.duration // interval) + 1) * float(interval)
+            xs = ((ts / self.duration) * w).astype(np.int64).tolist()
+        else:
+            ts = np.zeros(1)
+            xs = [0]
+        y = h - margin_bottom
+        painter.setPen(QPen(QColor('#E4E7EB'), 1))
+        painter.drawLines([QLine(x, y, x, y + 4) for x in xs])
         painter.setPen(QColor('#9CA3AF'))
         painter.setFont(QFont('Segoe UI', 7))
-        interval = self._get_time_interval()
-        t = 0.0
-        while t <= self.duration:
-            x = (t / self.duration) * w if self.duration > 0 else 0
-            painter.setPen(QPen(QColor('#E4E7EB'), 1))
-            painter.drawLine(int(x), h - margin_bottom, int(x), h - margin_bottom + 4)
-            painter.setPen(QColor('#9CA3AF'))
-            mins = int(t // 60)
-            secs = t % 60
-            painter.drawText(int(x) + 2, h - 4, f"{mins}:{secs:04.1f}")
-            t += interval
-
-        # Playhead
-        if self.duration > 0 and self._playhead_time >= 0:
-            px = (self._playhead_time / self.duration) * w
-
-            # Playhead shadow
-            painter.setPen(QPen(QColor(239, 68, 68, 40), 6))
-            painter.drawLine(int(px), 0, int(px), h - margin_bottom)
-
-            # Playhead line
-            painter.setPen(QPen(QColor('#EF4444'), 2))
-            painter.drawLine(int(px), 0, int(px), h - margin_bottom)
-
-            # Playhead handle (triangle at top)
-            painter.setBrush(QColor('#EF4444'))
-            painter.setPen(Qt.NoPen)
-            triangle = QPolygonF([
-                QPointF(px - 5, 0),
-                QPointF(px + 5, 0),
-                QPointF(px, 8),
-            ])
-            painter.drawPolygon(triangle)
+        for x, t in zip(xs, ts.tolist()):
+            painter.drawText(x + 2, h - 4, f"{int(t // 60)}:{t % 60:04.1f}")
 
     def _get_time_interval(self):
         """Calculate appropriate time interval for markers."""